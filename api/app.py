@@ -8,7 +8,6 @@ from werkzeug.utils import secure_filename
 from flask_mail import Mail, Message
 from flask_cors import CORS
 
-
 # Use DATABASE_URL from environment (Render sets this for you)
 app = Flask(__name__)
 
@@ -22,9 +21,17 @@ CORS(app,
     ],
     methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
     allow_headers=['Content-Type', 'Authorization', 'Accept'],
+    expose_headers=['X-DB-Calls'],
     supports_credentials=True
 )
 
+# Fast JSON encoding and compressed responses. json_responses.py is a copy of
+# backend/json_responses.py (kept identical by backend/test_shared_helpers.py), so this
+# service deploys on its own
+from json_responses import init_json_responses
+
+init_json_responses(app)
+
 # Flask-Mail configuration
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.zoho.com')
 app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
@@ -46,6 +53,14 @@ else:
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 
+# --- DB round trips per request: X-DB-Calls header, repeated statements logged as possible N+1 ---
+# db_calls.py is a copy of backend/db_calls.py (kept identical by backend/test_shared_helpers.py);
+# tests can use its assert_db_calls
+from db_calls import init_db_call_tracking, install_sqlalchemy_counter
+
+install_sqlalchemy_counter()
+init_db_call_tracking(app)
+
 
 
 # Import text for raw SQL execution
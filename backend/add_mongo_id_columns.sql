@@ -0,0 +1,17 @@
+-- Source Mongo _id on migrated rows
+-- Run this in your Supabase SQL Editor before migrate_mongo_to_supabase.py
+--
+-- migrate_mongo_to_supabase.py upserts every row on mongo_id with ON CONFLICT DO NOTHING,
+-- so resuming or re-running the migration never duplicates payments/notes and never
+-- overwrites rows edited after they were migrated. Rows created by the app keep NULL.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS mongo_id VARCHAR(24) UNIQUE;
+ALTER TABLE clients ADD COLUMN IF NOT EXISTS mongo_id VARCHAR(24) UNIQUE;
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS mongo_id VARCHAR(24) UNIQUE;
+ALTER TABLE notes ADD COLUMN IF NOT EXISTS mongo_id VARCHAR(24) UNIQUE;
+
+-- Verify the columns
+SELECT table_name, column_name, data_type
+FROM information_schema.columns
+WHERE column_name = 'mongo_id'
+ORDER BY table_name;
@@ -0,0 +1,144 @@
+"""
+Portfolio analytics for Cashflow CRM
+Computes the dashboard summary, status breakdown and loan type breakdown
+in a single pass so callers never have to scan the client book more than once
+"""
+
+from typing import List, Dict, Any, Iterable
+
+# Loans carry a flat 50% interest charge
+INTEREST_MULTIPLIER = 1.5
+ACTIVE_STATUSES = ['active', 'repayment-due', 'overdue']
+
+def new_rollup() -> Dict[str, Any]:
+    """Create an empty set of portfolio accumulators"""
+    return {
+        'totalClients': 0,
+        'totalLoanAmount': 0,
+        'totalAmountPaid': 0,
+        'statusCounts': {},
+        'loanTypes': {}
+    }
+
+def apply_client(rollup: Dict[str, Any], status: str, loan_type: str,
+                 loan_amount: float, amount_paid: float, sign: int = 1) -> Dict[str, Any]:
+    """Add (sign=1) or remove (sign=-1) one client's contribution to a rollup"""
+    status = status or 'unknown'
+    loan_type = loan_type or 'unknown'
+    loan_amount = loan_amount or 0
+    amount_paid = amount_paid or 0
+
+    rollup['totalClients'] += sign
+    rollup['totalLoanAmount'] += sign * loan_amount
+    rollup['totalAmountPaid'] += sign * amount_paid
+
+    status_counts = rollup['statusCounts']
+    status_counts[status] = status_counts.get(status, 0) + sign
+    if status_counts[status] <= 0:
+        del status_counts[status]
+
+    type_data = rollup['loanTypes'].setdefault(loan_type, {'count': 0, 'totalAmount': 0, 'totalPaid': 0})
+    type_data['count'] += sign
+    type_data['totalAmount'] += sign * loan_amount
+    type_data['totalPaid'] += sign * amount_paid
+    if type_data['count'] <= 0:
+        del rollup['loanTypes'][loan_type]
+
+    return rollup
+
+def compute_rollup(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a rollup from raw (snake_case) client rows in one sweep"""
+    rollup = new_rollup()
+    for row in rows:
+        apply_client(rollup, row.get('status'), row.get('loan_type'),
+                     row.get('loan_amount'), row.get('amount_paid'))
+    return rollup
+
+def format_analytics(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a rollup into the summary/statusBreakdown/loanTypeBreakdown payload"""
+    total_clients = rollup['totalClients']
+    total_loan_amount = rollup['totalLoanAmount']
+    total_amount_paid = rollup['totalAmountPaid']
+    status_counts = rollup['statusCounts']
+
+    total_due = total_loan_amount * INTEREST_MULTIPLIER
+
+    summary = {
+        'totalClients': total_clients,
+        'totalLoanAmount': total_loan_amount,
+        'totalAmountPaid': total_amount_paid,
+        'totalAmountDue': total_due,
+        'totalOutstanding': max(0, total_due - total_amount_paid),
+        'activeLoans': sum(status_counts.get(status, 0) for status in ACTIVE_STATUSES),
+        'overdueCount': status_counts.get('overdue', 0),
+        'paidCount': status_counts.get('paid', 0),
+        'repaymentRate': (total_amount_paid / total_due * 100) if total_due > 0 else 0,
+        'avgLoanAmount': total_loan_amount / total_clients if total_clients > 0 else 0
+    }
+
+    status_breakdown = [{"status": status, "count": count} for status, count in status_counts.items()]
+
+    loan_type_breakdown = []
+    for loan_type, data in rollup['loanTypes'].items():
+        type_due = data['totalAmount'] * INTEREST_MULTIPLIER
+        loan_type_breakdown.append({
+            "type": loan_type,
+            "count": data['count'],
+            "amount": data['totalAmount'],
+            "totalDue": type_due,
+            "outstanding": max(0, type_due - data['totalPaid'])
+        })
+
+    return {
+        'summary': summary,
+        'statusBreakdown': status_breakdown,
+        'loanTypeBreakdown': loan_type_breakdown
+    }
+
+def rollup_from_aggregates(totals: Dict[str, Any], statuses: List[Dict[str, Any]],
+                           loan_types: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a rollup from pre-aggregated GROUP BY results (SQL function or $group)"""
+    rollup = new_rollup()
+    rollup['totalClients'] = (totals or {}).get('totalClients') or 0
+    rollup['totalLoanAmount'] = (totals or {}).get('totalLoanAmount') or 0
+    rollup['totalAmountPaid'] = (totals or {}).get('totalAmountPaid') or 0
+
+    for entry in statuses or []:
+        rollup['statusCounts'][entry.get('status') or 'unknown'] = entry.get('count') or 0
+
+    for entry in loan_types or []:
+        rollup['loanTypes'][entry.get('type') or 'unknown'] = {
+            'count': entry.get('count') or 0,
+            'totalAmount': entry.get('totalAmount') or 0,
+            'totalPaid': entry.get('totalPaid') or 0
+        }
+
+    return rollup
+
+def rollup_from_table(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a rollup from portfolio_rollup table rows"""
+    totals = {}
+    statuses = []
+    loan_types = []
+
+    for row in rows:
+        count = row.get('client_count') or 0
+        if row.get('dimension') == 'total':
+            totals = {
+                'totalClients': count,
+                'totalLoanAmount': row.get('loan_amount') or 0,
+                'totalAmountPaid': row.get('amount_paid') or 0
+            }
+        elif count <= 0:
+            continue
+        elif row.get('dimension') == 'status':
+            statuses.append({'status': row.get('key'), 'count': count})
+        elif row.get('dimension') == 'loan_type':
+            loan_types.append({
+                'type': row.get('key'),
+                'count': count,
+                'totalAmount': row.get('loan_amount') or 0,
+                'totalPaid': row.get('amount_paid') or 0
+            })
+
+    return rollup_from_aggregates(totals, statuses, loan_types)
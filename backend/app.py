@@ -1,14 +1,28 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from datetime import datetime
 import os
+import hashlib
+import io
+import csv
+import logging
 from dotenv import load_dotenv
-from supabase_database import db_service
+from app_logging import configure_logging, init_request_logging
+
+# Before the service modules are imported, so their start-up messages are formatted too
+configure_logging()
+
+from supabase_database import db_service, BULK_BATCH_SIZE
+from json_responses import init_json_responses
+from metrics import init_metrics
+from db_calls import init_db_call_tracking
 from models import validate_client_data, validate_payment_data, validate_user_data, CLIENT_STATUS_OPTIONS, UserModel
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 CORS(app, origins=[
     "http://localhost:5173", 
@@ -17,14 +31,33 @@ CORS(app, origins=[
     "https://cashflow-crm.vercel.app/crm",
     "https://cashflow-crm.onrender.com",
     "https://loan-forms.vercel.app"
-], supports_credentials=True)  # Allow requests from React frontend
+], supports_credentials=True, expose_headers=['X-DB-Calls', 'X-Request-ID'])  # Allow requests from React frontend
+
+# Correlation id per request (X-Request-ID) stamped on every log record
+init_request_logging(app)
+
+# orjson encoding and gzip/brotli compression for every response
+init_json_responses(app)
+
+# Per-route latency, in-flight requests and service/scheduler timings at /metrics
+init_metrics(app)
 
-print(f"✅ Connected to Supabase successfully!")
-print(f"🚀 Starting Cashflow CRM API...")
-print(f"📊 Database: {os.getenv('DB_NAME', 'cashflowloans')}")
-print(f"📦 Collection: clients, payments, documents, notes")
-print(f"🌐 Frontend URL: https://cashflow-crm.vercel.app/crm")
-print(f"🔗 Backend URL: https://cashflow-crm.onrender.com")
+# Supabase round trips per request in X-DB-Calls, with repeated query shapes logged
+init_db_call_tracking(app)
+
+logger.info("✅ Connected to Supabase successfully!")
+logger.info("🚀 Starting Cashflow CRM API...")
+logger.info("📊 Database: %s", os.getenv('DB_NAME', 'cashflowloans'))
+logger.info("📦 Collection: clients, payments, documents, notes")
+logger.info("🌐 Frontend URL: https://cashflow-crm.vercel.app/crm")
+logger.info("🔗 Backend URL: https://cashflow-crm.onrender.com")
+
+# Page size bounds for cursor-paginated client listings
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Upper bound for the batch_size of bulk client imports
+MAX_IMPORT_BATCH_SIZE = 1000
 
 # Helper function for error responses
 def error_response(message: str, status_code: int = 400):
@@ -39,6 +72,50 @@ def success_response(data=None, message: str = "Success"):
             response['data'] = data
     return jsonify(response)
 
+def read_bulk_rows(key: str):
+    """Read bulk import rows from a JSON body, a text/csv body or a multipart CSV 'file'"""
+    if 'file' in request.files:
+        stream = io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig')
+        return list(csv.DictReader(stream))
+    
+    if request.mimetype == 'text/csv':
+        # Parse the body as it streams in rather than buffering it first
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig')
+        return list(csv.DictReader(stream))
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list):
+        return None
+    return [row for row in data if isinstance(row, dict)]
+
+def make_etag(*parts) -> str:
+    """Strong ETag for a representation identified by parts (a data version plus what was asked for)"""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def not_modified(etag: str):
+    """A 304 response if the client already holds this version, otherwise None"""
+    if etag and request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        return with_etag(response, etag)
+    return None
+
+def with_etag(response, etag: str):
+    # no-cache: browsers keep the body but revalidate with If-None-Match on every request
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def clients_version():
+    """Version of the clients table for conditional GETs, or None if it can't be read"""
+    try:
+        return db_service.get_clients_version()
+    except Exception:
+        # Serve the request normally (without an ETag) rather than fail it
+        return None
+
 # Root and Info endpoints
 @app.route('/')
 def root():
@@ -64,7 +141,8 @@ def api_info():
             'health': '/api/health',
             'clients': '/api/clients',
             'users': '/api/users',
-            'analytics': '/api/analytics'
+            'analytics': '/api/analytics',
+            'metrics': '/metrics'
         }
     })
 
@@ -78,6 +156,7 @@ def health_check():
             'status': 'healthy' if is_connected else 'unhealthy',
             'message': 'Cashflow CRM API is running',
             'database': 'connected' if is_connected else 'disconnected',
+            'clientCache': db_service.get_cache_stats(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -91,45 +170,136 @@ def health_check():
 # Client management endpoints
 @app.route('/api/clients', methods=['GET'])
 def get_clients():
-    """Get all clients with optional archived parameter"""
+    """Get clients with optional filters, projection and cursor pagination"""
+    # Filters: status, loan_type (comma-separated), due_from, due_to, q (text search)
+    # Projection: fields=id,name,status,...
+    # Pagination: limit and cursor switch the response to {'clients', 'nextCursor', 'count'}
+    # Streaming: stream=json (chunked JSON array) or stream=ndjson dumps every match page by page
     try:
-        print(f"🔍 GET /api/clients - Fetching all clients")
+        logger.debug("🔍 GET /api/clients - Fetching clients")
+        
+        # One cheap version query answers unchanged refreshes without reading the table
+        version = clients_version()
+        etag = make_etag('clients', version, request.full_path) if version else None
+        cached = not_modified(etag)
+        if cached:
+            return cached
         
         # Check for include_archived parameter
         include_archived = request.args.get('include_archived', 'false').lower() == 'true'
         
-        clients = db_service.get_all_clients(include_archived=include_archived)
-        print(f"✅ Found {len(clients)} clients: {[c.get('name', 'No name') for c in clients]}")
-        return jsonify(clients)
+        def list_arg(name):
+            value = request.args.get(name, '')
+            return [item.strip() for item in value.split(',') if item.strip()] or None
+        
+        filters = {
+            'include_archived': include_archived,
+            'status': list_arg('status'),
+            'loan_type': list_arg('loan_type'),
+            'due_from': request.args.get('due_from') or None,
+            'due_to': request.args.get('due_to') or None,
+            'search': request.args.get('q') or None,
+            'fields': list_arg('fields')
+        }
+        
+        stream = request.args.get('stream', '').lower()
+        if not stream and request.accept_mimetypes.best == 'application/x-ndjson':
+            stream = 'ndjson'
+        if stream:
+            if stream not in ('json', 'ndjson'):
+                return error_response("stream must be json or ndjson")
+            return with_etag(stream_clients(stream, filters), etag)
+        
+        paginated = 'limit' in request.args or 'cursor' in request.args
+        limit = None
+        if paginated:
+            try:
+                limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+            except ValueError:
+                return error_response("limit must be an integer")
+        
+        try:
+            if paginated:
+                page = db_service.list_clients(
+                    limit=limit,
+                    cursor=request.args.get('cursor') or None,
+                    **filters
+                )
+                clients = page['clients']
+            else:
+                # Page through every match: one unbounded select would be cut off at PostgREST's max-rows
+                clients = [client for page_clients in db_service.iter_client_pages(**filters)
+                           for client in page_clients]
+        except ValueError as e:
+            return error_response(str(e))
+        
+        logger.debug("✅ Found %s clients", len(clients))
+        
+        if paginated:
+            return with_etag(jsonify({
+                'clients': clients,
+                'nextCursor': page['nextCursor'],
+                'count': len(clients)
+            }), etag)
+        return with_etag(jsonify(clients), etag)
     except Exception as e:
-        print(f"❌ Error fetching clients: {str(e)}")
+        logger.error("❌ Error fetching clients: %s", e)
         return error_response(f"Failed to fetch clients: {str(e)}", 500)
 
+def stream_clients(stream: str, filters):
+    """Stream every matching client as a chunked JSON array or NDJSON, one database page at a time"""
+    # Only one page of rows (and its encoded chunk) is ever held in memory
+    dumps = app.json.dumps
+    
+    def generate():
+        count = 0
+        if stream == 'json':
+            yield '['
+        try:
+            for page in db_service.iter_client_pages(**filters):
+                yield encode_page(page, count)
+                count += len(page)
+        except Exception as e:
+            # Headers are already sent; ending without the closing bracket marks the dump as incomplete
+            logger.error("❌ Error streaming clients after %s rows: %s", count, e)
+            raise
+        if stream == 'json':
+            yield ']'
+        logger.debug("✅ Streamed %s clients", count)
+    
+    def encode_page(page, written):
+        if stream == 'ndjson':
+            return "".join(dumps(client) + "\n" for client in page)
+        return ("," if written else "") + ",".join(dumps(client) for client in page)
+    
+    mimetype = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+    return Response(generate(), mimetype=mimetype)
+
 @app.route('/api/clients', methods=['POST'])
 def create_client():
     """Create a new client"""
     try:
-        print(f"🔍 POST /api/clients - Received request")
+        logger.debug("🔍 POST /api/clients - Received request")
         data = request.get_json()
-        print(f"📝 Request data: {data}")
+        logger.debug("📝 Request data: %s", data)
         
         if not data:
-            print("❌ No data provided")
+            logger.warning("❌ No data provided")
             return error_response("No data provided")
         
         # Validate client data
-        print(f"🔍 Validating client data...")
+        logger.debug("🔍 Validating client data...")
         is_valid, errors = validate_client_data(data)
-        print(f"✅ Validation result: valid={is_valid}, errors={errors}")
+        logger.debug("✅ Validation result: valid=%s, errors=%s", is_valid, errors)
         
         if not is_valid:
-            print(f"❌ Validation failed: {errors}")
+            logger.warning("❌ Validation failed: %s", errors)
             return error_response(f"Validation errors: {', '.join(errors)}")
         
         # Create client
-        print(f"🔍 Creating client in database...")
+        logger.debug("🔍 Creating client in database...")
         client = db_service.create_client(data)
-        print(f"✅ Client created successfully: {client}")
+        logger.debug("✅ Client created successfully: %s", client)
         
         return jsonify({
             'success': True,
@@ -138,11 +308,38 @@ def create_client():
         }), 201
         
     except Exception as e:
-        print(f"❌ Error creating client: {str(e)}")
-        import traceback
-        print(f"📍 Full traceback: {traceback.format_exc()}")
+        logger.exception("❌ Error creating client: %s", e)
         return error_response(f"Failed to create client: {str(e)}", 500)
 
+@app.route('/api/clients/bulk', methods=['POST'])
+def import_clients_bulk():
+    """Import many clients/leads at once from a JSON list or a CSV upload"""
+    # JSON: [{"name", "email", "phone", "loanAmount", "loanType", ...}, ...] or {"clients": [...]}
+    # CSV: text/csv body or multipart 'file' with the same column names
+    # Query: batch_size (rows per insert, max MAX_IMPORT_BATCH_SIZE), dedupe=false to skip duplicate checks
+    try:
+        clients = read_bulk_rows('clients')
+        
+        if clients is None:
+            return error_response("Send a JSON list of clients or a CSV file")
+        if not clients:
+            return error_response("No clients provided")
+        
+        try:
+            batch_size = min(max(int(request.args.get('batch_size', BULK_BATCH_SIZE)), 1), MAX_IMPORT_BATCH_SIZE)
+        except ValueError:
+            return error_response("batch_size must be an integer")
+        dedupe = request.args.get('dedupe', 'true').lower() != 'false'
+        
+        logger.debug("🔍 POST /api/clients/bulk - Importing %s clients", len(clients))
+        summary = db_service.import_clients_bulk(clients, batch_size=batch_size, dedupe=dedupe)
+        
+        return success_response(summary, f"Imported {summary['created']} of {summary['total']} clients")
+        
+    except Exception as e:
+        logger.error("❌ Error importing clients: %s", e)
+        return error_response(f"Failed to import clients: {str(e)}", 500)
+
 @app.route('/api/clients/<client_id>', methods=['GET'])
 def get_client(client_id):
     """Get a specific client"""
@@ -150,7 +347,8 @@ def get_client(client_id):
         client = db_service.get_client_by_id(client_id)
         
         if client:
-            return jsonify(client)
+            etag = make_etag('client', client.get('id'), client.get('updatedAt'))
+            return not_modified(etag) or with_etag(jsonify(client), etag)
         else:
             return error_response('Client not found', 404)
             
@@ -231,9 +429,9 @@ def delete_client(client_id):
 def add_loan_to_client(client_id):
     """Add an additional loan to an existing client"""
     try:
-        print(f"🔍 POST /api/clients/{client_id}/loans - Adding additional loan")
+        logger.debug("🔍 POST /api/clients/%s/loans - Adding additional loan", client_id)
         data = request.get_json()
-        print(f"📝 Loan data: {data}")
+        logger.debug("📝 Loan data: %s", data)
         
         if not data:
             return error_response("No data provided")
@@ -243,9 +441,9 @@ def add_loan_to_client(client_id):
             return error_response("Valid loan amount is required")
         
         # Add loan to client
-        print(f"🔍 Adding additional loan to client...")
+        logger.debug("🔍 Adding additional loan to client...")
         updated_client = db_service.add_loan_to_client(client_id, data)
-        print(f"✅ Additional loan added successfully: {updated_client}")
+        logger.debug("✅ Additional loan added successfully: %s", updated_client)
         
         if updated_client:
             return jsonify({
@@ -257,9 +455,7 @@ def add_loan_to_client(client_id):
             return error_response('Client not found', 404)
             
     except Exception as e:
-        print(f"❌ Error adding additional loan: {str(e)}")
-        import traceback
-        print(f"📍 Full traceback: {traceback.format_exc()}")
+        logger.exception("❌ Error adding additional loan: %s", e)
         return error_response(f"Failed to add additional loan: {str(e)}", 500)
 
 @app.route('/api/clients/<client_id>/loans', methods=['GET'])
@@ -313,24 +509,24 @@ def unarchive_client(client_id):
 def add_payment(client_id):
     """Add a payment for a client"""
     try:
-        print(f"🔍 POST /api/clients/{client_id}/payments - Adding payment")
+        logger.debug("🔍 POST /api/clients/%s/payments - Adding payment", client_id)
         data = request.get_json()
-        print(f"📝 Payment data: {data}")
+        logger.debug("📝 Payment data: %s", data)
         
         if not data:
             return error_response("No data provided")
         
         # Validate payment data
         is_valid, errors = validate_payment_data({**data, 'clientId': client_id})
-        print(f"✅ Validation result: valid={is_valid}, errors={errors}")
+        logger.debug("✅ Validation result: valid=%s, errors=%s", is_valid, errors)
         
         if not is_valid:
             return error_response(f"Validation errors: {', '.join(errors)}")
         
         # Add payment
-        print(f"🔍 Adding payment to database...")
+        logger.debug("🔍 Adding payment to database...")
         updated_client = db_service.add_payment(client_id, data)
-        print(f"✅ Payment added successfully: {updated_client}")
+        logger.debug("✅ Payment added successfully: %s", updated_client)
         
         if updated_client:
             return jsonify({
@@ -342,9 +538,7 @@ def add_payment(client_id):
             return error_response('Client not found', 404)
             
     except Exception as e:
-        print(f"❌ Error adding payment: {str(e)}")
-        import traceback
-        print(f"📍 Full traceback: {traceback.format_exc()}")
+        logger.exception("❌ Error adding payment: %s", e)
         return error_response(f"Failed to add payment: {str(e)}", 500)
 
 @app.route('/api/clients/<client_id>/payments', methods=['GET'])
@@ -356,6 +550,28 @@ def get_client_payments(client_id):
     except Exception as e:
         return error_response(f"Failed to fetch payments: {str(e)}", 500)
 
+@app.route('/api/payments/bulk', methods=['POST'])
+def add_payments_bulk():
+    """Post many payments at once from a JSON list or a CSV upload"""
+    # JSON: [{"clientId", "amount", "payment_date", "notes"}, ...] or {"payments": [...]}
+    # CSV: text/csv body or multipart 'file' with clientId (or client_id), amount, payment_date, notes
+    try:
+        payments = read_bulk_rows('payments')
+        
+        if payments is None:
+            return error_response("Send a JSON list of payments or a CSV file")
+        if not payments:
+            return error_response("No payments provided")
+        
+        logger.debug("🔍 POST /api/payments/bulk - Posting %s payments", len(payments))
+        summary = db_service.add_payments_bulk(payments)
+        
+        return success_response(summary, f"Posted {summary['posted']} of {summary['total']} payments")
+        
+    except Exception as e:
+        logger.error("❌ Error posting bulk payments: %s", e)
+        return error_response(f"Failed to post payments: {str(e)}", 500)
+
 # Note endpoints
 @app.route('/api/clients/<client_id>/notes', methods=['POST'])
 def add_note(client_id):
@@ -383,16 +599,21 @@ def add_note(client_id):
 def get_analytics():
     """Get analytics data for dashboard"""
     try:
-        analytics = db_service.get_analytics_data()
-        status_breakdown = db_service.get_status_breakdown()
-        loan_type_breakdown = db_service.get_loan_type_breakdown()
-        
-        return jsonify({
-            'summary': analytics,
-            'statusBreakdown': status_breakdown,
-            'loanTypeBreakdown': loan_type_breakdown,
+        # Analytics only change when a client does
+        version = clients_version()
+        etag = make_etag('analytics', version) if version else None
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        analytics = db_service.get_dashboard_analytics()
+        
+        return with_etag(jsonify({
+            'summary': analytics['summary'],
+            'statusBreakdown': analytics['statusBreakdown'],
+            'loanTypeBreakdown': analytics['loanTypeBreakdown'],
             'timestamp': datetime.now().isoformat()
-        })
+        }), etag)
     except Exception as e:
         return error_response(f"Failed to fetch analytics: {str(e)}", 500)
 
@@ -405,6 +626,15 @@ def get_analytics_summary():
     except Exception as e:
         return error_response(f"Failed to fetch analytics summary: {str(e)}", 500)
 
+@app.route('/api/analytics/rebuild', methods=['POST'])
+def rebuild_analytics():
+    """Rebuild the portfolio rollup from the clients table"""
+    try:
+        analytics = db_service.rebuild_portfolio_rollup()
+        return success_response(analytics, "Portfolio rollup rebuilt")
+    except Exception as e:
+        return error_response(f"Failed to rebuild analytics: {str(e)}", 500)
+
 # Utility endpoints
 @app.route('/api/clients/<client_id>/calculate', methods=['GET'])
 def calculate_client_amounts(client_id):
@@ -537,7 +767,7 @@ def test_notification():
     try:
         from notification_scheduler import notification_scheduler
         
-        print("🧪 Testing notification system...")
+        logger.info("🧪 Testing notification system...")
         success = notification_scheduler.test_notification()
         
         if success:
@@ -549,7 +779,7 @@ def test_notification():
             return error_response("Failed to send test notification", 500)
             
     except Exception as e:
-        print(f"❌ Test notification error: {e}")
+        logger.error("❌ Test notification error: %s", e)
         return error_response(f"Failed to test notification: {str(e)}", 500)
 
 @app.route('/api/notifications/check-due', methods=['GET'])
@@ -567,7 +797,7 @@ def check_payments_due():
         }, f"Found {len(clients_due)} clients with payments due")
         
     except Exception as e:
-        print(f"❌ Check payments due error: {e}")
+        logger.error("❌ Check payments due error: %s", e)
         return error_response(f"Failed to check payments due: {str(e)}", 500)
 
 @app.route('/api/notifications/send-due', methods=['POST'])
@@ -600,9 +830,24 @@ def send_payment_due_notifications():
             return error_response("Failed to send notifications", 500)
             
     except Exception as e:
-        print(f"❌ Send notifications error: {e}")
+        logger.error("❌ Send notifications error: %s", e)
         return error_response(f"Failed to send notifications: {str(e)}", 500)
 
+@app.route('/api/notifications/status-sweep', methods=['POST'])
+def run_status_sweep():
+    """Run the overdue / repayment-due status sweep now"""
+    try:
+        counts = db_service.sweep_client_statuses()
+        
+        return success_response({
+            'transitions': counts,
+            'updated': sum(counts.values())
+        }, f"Moved {sum(counts.values())} clients")
+        
+    except Exception as e:
+        logger.error("❌ Status sweep error: %s", e)
+        return error_response(f"Failed to sweep statuses: {str(e)}", 500)
+
 @app.route('/api/notifications/schedule-start', methods=['POST'])
 def start_notification_scheduler():
     """Start the background notification scheduler"""
@@ -614,11 +859,12 @@ def start_notification_scheduler():
         return success_response({
             'message': 'Notification scheduler started',
             'schedule': 'Daily at 9:00 AM and 5:00 PM',
+            'statusSweep': 'Daily at 00:05 and 8:55 AM',
             'trigger': 'Day before month-end'
         }, "Scheduler started successfully")
         
     except Exception as e:
-        print(f"❌ Start scheduler error: {e}")
+        logger.error("❌ Start scheduler error: %s", e)
         return error_response(f"Failed to start scheduler: {str(e)}", 500)
 
 @app.route('/api/notifications/schedule-stop', methods=['POST'])
@@ -634,7 +880,7 @@ def stop_notification_scheduler():
         }, "Scheduler stopped successfully")
         
     except Exception as e:
-        print(f"❌ Stop scheduler error: {e}")
+        logger.error("❌ Stop scheduler error: %s", e)
         return error_response(f"Failed to stop scheduler: {str(e)}", 500)
 
 # For development only
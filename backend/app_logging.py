@@ -0,0 +1,104 @@
+"""
+Structured, level-gated logging for the Cashflow CRM API
+Configures the root logger once (LOG_LEVEL, LOG_FORMAT=json|text), stamps every record
+with the correlation id of the request it belongs to (X-Request-ID, generated when the
+caller sends none) and samples DEBUG output per request (LOG_DEBUG_SAMPLE_RATE).
+
+Log with %-style arguments (logger.debug("Loaded %s", rows)) so messages are only
+formatted when a record is actually emitted.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+
+# Fraction of requests whose DEBUG records are kept when LOG_LEVEL=DEBUG
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0'))
+
+# Libraries that log every HTTP round trip at INFO
+QUIET_LOGGERS = ['httpx', 'httpcore', 'hpack', 'urllib3']
+
+# Incoming correlation ids are echoed back, so only accept plain tokens
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_request_id: ContextVar[str] = ContextVar('request_id', default='-')
+_debug_sampled: ContextVar[bool] = ContextVar('debug_sampled', default=True)
+
+# LogRecord attributes that are not extra fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+class RequestContextFilter(logging.Filter):
+    """Attach the request id and drop DEBUG records of requests that weren't sampled"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and not _debug_sampled.get():
+            return False
+        record.request_id = _request_id.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; anything passed in extra= becomes a field"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'msg': record.getMessage()
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def configure_logging():
+    """Set up the root logger (idempotent)"""
+    root = logging.getLogger()
+    if any(getattr(handler, '_cashflow_handler', False) for handler in root.handlers):
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler._cashflow_handler = True
+    handler.addFilter(RequestContextFilter())
+    if LOG_FORMAT == 'text':
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'))
+    else:
+        handler.setFormatter(JsonFormatter())
+
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+def init_request_logging(app, header: str = 'X-Request-ID'):
+    """Give every request a correlation id (echoed in the response) and a DEBUG sampling decision"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_logging():
+        incoming = request.headers.get(header, '')
+        request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        sampled = LOG_DEBUG_SAMPLE_RATE >= 1 or random.random() < LOG_DEBUG_SAMPLE_RATE
+        g.logging_tokens = (_request_id.set(request_id), _debug_sampled.set(sampled))
+
+    @app.after_request
+    def _add_request_id(response):
+        response.headers[header] = _request_id.get()
+        return response
+
+    @app.teardown_request
+    def _end_request_logging(error=None):
+        tokens = g.pop('logging_tokens', None)
+        if tokens is not None:
+            _request_id.reset(tokens[0])
+            _debug_sampled.reset(tokens[1])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark for client list responses
+Encode time (Flask's stdlib encoder vs orjson) and bytes on the wire
+(identity, gzip, brotli) for mapped client lists of 10k and 100k rows
+"""
+
+import sys
+import os
+import json
+import gzip
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from client_mapping import map_client_rows
+from bench_client_mapping import make_rows, best_of
+from json_responses import GZIP_LEVEL, BROTLI_QUALITY, orjson, brotli
+
+ROW_COUNTS = [int(count) for count in os.getenv('BENCH_SIZES', '10000,100000').split(',')]
+
+def stdlib_encode(clients):
+    """What jsonify produced before: sorted keys, compact separators, ASCII escapes"""
+    return json.dumps(clients, sort_keys=True, separators=(',', ':'), ensure_ascii=True).encode('utf-8')
+
+def orjson_encode(clients):
+    return orjson.dumps(clients, option=orjson.OPT_SORT_KEYS)
+
+def timed(func, value):
+    """(result, wall time) of one call"""
+    start = time.perf_counter()
+    result = func(value)
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    for count in ROW_COUNTS:
+        clients = map_client_rows(make_rows(count))
+
+        print(f"📊 Client list, {count:,} rows")
+        stdlib = best_of(stdlib_encode, clients)
+        print(f"  - encode stdlib json: {stdlib * 1000:8.1f} ms")
+        if orjson is not None:
+            fast = best_of(orjson_encode, clients)
+            print(f"  - encode orjson:      {fast * 1000:8.1f} ms  ({stdlib / fast:.1f}x)")
+        else:
+            print("  - encode orjson:      not installed")
+
+        body = stdlib_encode(clients)
+        print(f"  - identity:           {len(body) / 1024:8.0f} KiB")
+
+        compressed, elapsed = timed(lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL), body)
+        print(f"  - gzip {GZIP_LEVEL}:             {len(compressed) / 1024:8.0f} KiB  "
+              f"({len(body) / len(compressed):.1f}x smaller, {elapsed * 1000:.1f} ms)")
+
+        if brotli is not None:
+            compressed, elapsed = timed(lambda data: brotli.compress(data, quality=BROTLI_QUALITY), body)
+            print(f"  - brotli {BROTLI_QUALITY}:           {len(compressed) / 1024:8.0f} KiB  "
+                  f"({len(body) / len(compressed):.1f}x smaller, {elapsed * 1000:.1f} ms)")
+        else:
+            print("  - brotli:             not installed")
@@ -0,0 +1,441 @@
+"""
+Read-through cache of mapped client rows for Cashflow CRM
+A bounded LRU with a per-entry TTL. Each client is reachable by both its client_uuid
+and its numeric id; SupabaseService refreshes or drops entries on every write.
+
+Under gunicorn every worker has its own memory, so the sqlite backend (one file shared
+by all workers on the host) or the redis backend (shared across hosts) give one cache
+for all of them, and a write or invalidation in any worker is seen by every other.
+"""
+
+import copy
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class ClientCache:
+    """LRU + TTL cache of mapped clients keyed by client_uuid and numeric id"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> [expires_at, mapped client, all keys of the entry]; least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    @staticmethod
+    def keys_for(row: Dict[str, Any]) -> tuple:
+        """The lookup keys of a raw clients row"""
+        return tuple(dict.fromkeys(str(key) for key in (row.get('client_uuid'), row.get('id')) if key is not None))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached client, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(str(key))
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry[0] <= time.monotonic():
+                self._drop(entry)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            for entry_key in entry[2]:
+                self._entries.move_to_end(entry_key)
+            self.hits += 1
+            value = entry[1]
+
+        # Callers are free to modify what they get back
+        return copy.deepcopy(value)
+
+    def put(self, keys: Iterable[str], client: Dict[str, Any]):
+        """Cache a mapped client under all of its keys, replacing any older entry"""
+        if not self.enabled:
+            return
+
+        keys = tuple(str(key) for key in keys)
+        if not keys:
+            return
+
+        entry = [time.monotonic() + self.ttl, copy.deepcopy(client), keys]
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._drop(self._entries[key])
+
+            for key in keys:
+                self._entries[key] = entry
+            self._size += 1
+
+            while self._size > self.max_size:
+                self._drop(next(iter(self._entries.values())))
+                self.evictions += 1
+
+    def invalidate(self, *keys: str):
+        """Drop the entries reachable through any of the given keys"""
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(str(key))
+                if entry is not None:
+                    self._drop(entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _drop(self, entry: list):
+        """Remove an entry under all of its keys (caller holds the lock)"""
+        removed = False
+        for key in entry[2]:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                removed = True
+        if removed:
+            self._size -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'memory',
+                'size': self._size,
+                'maxSize': self.max_size,
+                'ttlSeconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class SQLiteClientCache:
+    """Client cache shared by every worker process on the host through one SQLite file
+
+    Workers read and write the same store, so a client written by one worker is served to
+    the others and an invalidation is seen by all of them on their next lookup. Eviction
+    drops the oldest-written entries (hits are reads only, to keep workers off the write lock).
+    """
+
+    def __init__(self, path: str, max_size: int, ttl: float):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+        if self.enabled:
+            self._connect()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; the schema is created by whichever worker gets there first"""
+        connection = getattr(self._local, 'connection', None)
+        # A connection inherited across fork (gunicorn --preload) must not be reused
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS client_entries (
+                    entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    expires_at REAL NOT NULL,
+                    value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS client_keys (
+                    key TEXT PRIMARY KEY,
+                    entry_id INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_client_keys_entry ON client_keys (entry_id);
+            """)
+            try:
+                # Cached clients are personal data; keep the file private to this user
+                os.chmod(self.path, 0o600)
+            except OSError:
+                pass
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _failed(self, action: str, error: Exception):
+        # The cache is an optimisation; a broken store must never fail the request
+        self._count('errors')
+        logger.warning("⚠️ Shared client cache %s failed: %s", action, error)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        try:
+            row = self._connect().execute(
+                "SELECT e.expires_at, e.value FROM client_keys k JOIN client_entries e USING (entry_id) WHERE k.key = ?",
+                (str(key),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._failed('read', e)
+            return None
+
+        if row is None:
+            self._count('misses')
+            return None
+
+        if row[0] <= time.time():
+            self._count('expirations')
+            self._count('misses')
+            self.invalidate(key)
+            return None
+
+        self._count('hits')
+        return json.loads(row[1])
+
+    def put(self, keys: Iterable[str], client: Dict[str, Any]):
+        if not self.enabled:
+            return
+
+        keys = tuple(str(key) for key in keys)
+        if not keys:
+            return
+
+        try:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_entries(connection, keys)
+                entry_id = connection.execute(
+                    "INSERT INTO client_entries (expires_at, value) VALUES (?, ?)",
+                    (time.time() + self.ttl, json.dumps(client, default=str))
+                ).lastrowid
+                connection.executemany("INSERT INTO client_keys (key, entry_id) VALUES (?, ?)",
+                                       [(key, entry_id) for key in keys])
+
+                expired = [row[0] for row in connection.execute(
+                    "SELECT entry_id FROM client_entries WHERE expires_at <= ?", (time.time(),))]
+                self._delete_entry_ids(connection, expired)
+
+                overflow = connection.execute("SELECT COUNT(*) FROM client_entries").fetchone()[0] - self.max_size
+                if overflow > 0:
+                    oldest = [row[0] for row in connection.execute(
+                        "SELECT entry_id FROM client_entries ORDER BY entry_id LIMIT ?", (overflow,))]
+                    self._delete_entry_ids(connection, oldest)
+                    self._count('evictions', len(oldest))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._failed('write', e)
+
+    def invalidate(self, *keys: str):
+        if not self.enabled or not keys:
+            return
+
+        try:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_entries(connection, [str(key) for key in keys])
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            # A stale entry left behind would be served to every worker until it expires
+            self._failed('invalidation', e)
+
+    def clear(self):
+        try:
+            connection = self._connect()
+            connection.execute("DELETE FROM client_keys")
+            connection.execute("DELETE FROM client_entries")
+        except sqlite3.Error as e:
+            self._failed('clear', e)
+
+    def _delete_entries(self, connection: sqlite3.Connection, keys: Iterable[str]):
+        """Delete the entries reachable through any of the keys, under all of their keys"""
+        placeholders = ",".join("?" for _ in keys)
+        entry_ids = [row[0] for row in connection.execute(
+            f"SELECT DISTINCT entry_id FROM client_keys WHERE key IN ({placeholders})", tuple(keys))]
+        self._delete_entry_ids(connection, entry_ids)
+
+    def _delete_entry_ids(self, connection: sqlite3.Connection, entry_ids: List[int]):
+        if not entry_ids:
+            return
+        placeholders = ",".join("?" for _ in entry_ids)
+        connection.execute(f"DELETE FROM client_keys WHERE entry_id IN ({placeholders})", entry_ids)
+        connection.execute(f"DELETE FROM client_entries WHERE entry_id IN ({placeholders})", entry_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        size = None
+        if self.enabled:
+            try:
+                size = self._connect().execute("SELECT COUNT(*) FROM client_entries").fetchone()[0]
+            except sqlite3.Error as e:
+                self._failed('read', e)
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            # size is shared by all workers; the counters are this worker's
+            return {
+                'backend': 'sqlite',
+                'size': size,
+                'maxSize': self.max_size,
+                'ttlSeconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'errors': self.errors,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class RedisClientCache:
+    """Client cache shared through Redis (or any Redis-compatible server) for multi-host deployments
+
+    Each client is stored once under client:entry:<n> with its keys pointing at it; expiry is
+    Redis's own, so eviction follows the server's maxmemory policy.
+    """
+
+    def __init__(self, url: str, ttl: float, prefix: str = 'cashflow:client:'):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("CLIENT_CACHE_BACKEND=redis requires the redis package (pip install redis)")
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self.redis = redis.Redis.from_url(url, socket_timeout=1)
+        self._errors = (redis.RedisError,)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _failed(self, action: str, error: Exception):
+        self._count('errors')
+        logger.warning("⚠️ Shared client cache %s failed: %s", action, error)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        try:
+            entry_key = self.redis.get(f"{self.prefix}key:{key}")
+            value = self.redis.get(entry_key) if entry_key else None
+        except self._errors as e:
+            self._failed('read', e)
+            return None
+
+        if value is None:
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        # Entries carry their keys for invalidation; callers only get the client
+        return json.loads(value)['client']
+
+    def put(self, keys: Iterable[str], client: Dict[str, Any]):
+        if not self.enabled:
+            return
+
+        keys = tuple(str(key) for key in keys)
+        if not keys:
+            return
+
+        try:
+            self.invalidate(*keys)
+            entry_key = f"{self.prefix}entry:{self.redis.incr(f'{self.prefix}seq')}"
+            ttl_ms = int(self.ttl * 1000)
+            pipeline = self.redis.pipeline()
+            pipeline.set(entry_key, json.dumps({'keys': keys, 'client': client}, default=str), px=ttl_ms)
+            for key in keys:
+                pipeline.set(f"{self.prefix}key:{key}", entry_key, px=ttl_ms)
+            pipeline.execute()
+        except self._errors as e:
+            self._failed('write', e)
+
+    def invalidate(self, *keys: str):
+        if not self.enabled or not keys:
+            return
+
+        try:
+            entry_keys = [entry_key for entry_key in self.redis.mget([f"{self.prefix}key:{key}" for key in keys]) if entry_key]
+            doomed = {f"{self.prefix}key:{key}" for key in keys}
+            for entry_key, value in zip(entry_keys, self.redis.mget(entry_keys) if entry_keys else []):
+                doomed.add(entry_key)
+                if value:
+                    doomed.update(f"{self.prefix}key:{key}" for key in json.loads(value)['keys'])
+            self.redis.delete(*doomed)
+        except self._errors as e:
+            self._failed('invalidation', e)
+
+    def clear(self):
+        try:
+            for key in self.redis.scan_iter(f"{self.prefix}*"):
+                self.redis.delete(key)
+        except self._errors as e:
+            self._failed('clear', e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'redis',
+                'ttlSeconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+def create_client_cache(backend: str, max_size: int, ttl: float, location: Optional[str] = None):
+    """Build the client cache for CLIENT_CACHE_BACKEND: memory (per process), sqlite or redis (shared)"""
+    backend = (backend or 'memory').lower()
+    if backend == 'sqlite':
+        path = location or os.path.join(tempfile.gettempdir(), 'cashflow_client_cache.sqlite3')
+        return SQLiteClientCache(path, max_size, ttl)
+    if backend == 'redis':
+        return RedisClientCache(location or 'redis://localhost:6379/0', ttl)
+    if backend != 'memory':
+        raise ValueError(f"Unknown CLIENT_CACHE_BACKEND: {backend}")
+    return ClientCache(max_size, ttl)
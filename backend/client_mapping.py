@@ -0,0 +1,150 @@
+"""
+Client field mapping for Cashflow CRM
+Converts between the snake_case clients table and the camelCase frontend format.
+The mapping tables are compiled once at import; use map_client_rows for lists.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Database column -> frontend field (camelCase)
+CLIENT_FIELD_MAPPINGS = {
+    'email': 'email',
+    'phone': 'phone',
+    'address': 'address',
+    'loan_amount': 'loanAmount',
+    'loan_type': 'loanType',
+    'amount_paid': 'amountPaid',
+    'status': 'status',
+    'application_date': 'applicationDate',
+    'last_status_update': 'lastStatusUpdate',
+    'id_number': 'idNumber',
+    'interest_rate': 'interestRate',
+    'start_date': 'startDate',
+    'due_date': 'dueDate',
+    'monthly_payment': 'monthlyPayment',
+    'payment_history': 'paymentHistory',
+    'documents': 'documents',
+    'notes': 'notes',
+    'created_at': 'createdAt',
+    'updated_at': 'updatedAt',
+    'last_payment_date': 'lastPaymentDate',
+    'repayment_due_date': 'repaymentDueDate'
+}
+
+# Frontend field -> database column, only where the names differ
+FRONTEND_TO_DB_FIELDS = {
+    frontend_field: db_field
+    for db_field, frontend_field in CLIENT_FIELD_MAPPINGS.items()
+    if frontend_field != db_field
+}
+
+# Frontend field -> clients columns needed to build it (used for fields= projection)
+CLIENT_FIELD_COLUMNS = {
+    'id': ['id', 'client_uuid'],
+    'name': ['first_name', 'last_name'],
+    **{frontend_field: [db_field] for db_field, frontend_field in CLIENT_FIELD_MAPPINGS.items()}
+}
+
+# Precompiled (db_field, frontend_field) pairs for the row mappers
+_FIELD_PAIRS = tuple(CLIENT_FIELD_MAPPINGS.items())
+
+def _map_full_row(client: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a full select("*") row in a single dict display
+
+    Raises KeyError when a column is missing, i.e. for projected rows.
+    """
+    return {
+        'id': client['client_uuid'] or str(client['id']),
+        'name': f"{client['first_name']} {client['last_name']}".strip(),
+        **{frontend_field: client[db_field] for db_field, frontend_field in _FIELD_PAIRS}
+    }
+
+def map_client_row(client: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a raw clients row to the frontend format"""
+    try:
+        return _map_full_row(client)
+    except KeyError:
+        pass
+
+    # Projected rows: only map the columns that were selected
+    # Handle ID mapping
+    if client.get('client_uuid'):
+        mapped_client = {'id': client['client_uuid']}
+    else:
+        mapped_client = {'id': str(client['id']) if 'id' in client else None}
+
+    # Combine first_name and last_name into name
+    if 'first_name' in client and 'last_name' in client:
+        mapped_client['name'] = f"{client['first_name']} {client['last_name']}".strip()
+
+    # Map all fields to frontend format (camelCase)
+    for db_field, frontend_field in _FIELD_PAIRS:
+        if db_field in client:
+            mapped_client[frontend_field] = client[db_field]
+
+    return mapped_client
+
+def map_client_rows(clients: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Map a list of raw clients rows to the frontend format"""
+    return list(map(map_client_row, clients))
+
+def to_db_fields(client_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Rename camelCase frontend fields to their snake_case columns (other keys pass through)"""
+    mapped_data = {field: value for field, value in client_data.items() if field not in FRONTEND_TO_DB_FIELDS}
+    # Frontend values win over any snake_case duplicates
+    mapped_data.update({
+        FRONTEND_TO_DB_FIELDS[field]: value
+        for field, value in client_data.items()
+        if field in FRONTEND_TO_DB_FIELDS
+    })
+    return mapped_data
+
+def prepare_client_record(client_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map frontend client data to a clients row ready for insert"""
+    # Handle field mapping between frontend and database
+    mapped_data = client_data.copy()
+
+    # Handle the frontend UUID - store it as client_uuid but don't use it as primary key
+    if 'id' in mapped_data:
+        mapped_data['client_uuid'] = mapped_data['id']
+        del mapped_data['id']  # Remove frontend id, let database auto-generate primary key
+
+    # Split name into first_name and last_name if needed
+    if 'name' in mapped_data and 'first_name' not in mapped_data:
+        name_parts = mapped_data['name'].split(' ', 1)
+        mapped_data['first_name'] = name_parts[0]
+        mapped_data['last_name'] = name_parts[1] if len(name_parts) > 1 else ''
+        del mapped_data['name']  # Remove the original name field
+
+    # Handle date fields - convert ISO timestamps to date strings where needed
+    if 'dueDate' in mapped_data and mapped_data['dueDate']:
+        # Convert ISO timestamp to date string (YYYY-MM-DD)
+        try:
+            if 'T' in str(mapped_data['dueDate']):
+                dt = datetime.fromisoformat(mapped_data['dueDate'].replace('Z', '+00:00'))
+                mapped_data['dueDate'] = dt.date().isoformat()
+        except Exception as e:
+            logger.warning("⚠️ Warning: Could not parse dueDate %s: %s", mapped_data['dueDate'], e)
+
+    if 'startDate' in mapped_data and mapped_data['startDate']:
+        # Ensure startDate is in YYYY-MM-DD format
+        if 'T' in str(mapped_data['startDate']):
+            try:
+                dt = datetime.fromisoformat(mapped_data['startDate'].replace('Z', '+00:00'))
+                mapped_data['startDate'] = dt.date().isoformat()
+            except Exception as e:
+                logger.warning("⚠️ Warning: Could not parse startDate %s: %s", mapped_data['startDate'], e)
+
+    # Map camelCase to snake_case fields
+    mapped_data = to_db_fields(mapped_data)
+
+    # Add timestamps
+    now = datetime.now(timezone.utc).isoformat()
+    mapped_data['created_at'] = now
+    mapped_data['updated_at'] = now
+
+    return mapped_data
@@ -0,0 +1,48 @@
+-- Dashboard analytics in a single round trip
+-- Run this in your Supabase SQL Editor
+-- Called by SupabaseService.get_dashboard_analytics via rpc('get_dashboard_analytics')
+
+CREATE OR REPLACE FUNCTION get_dashboard_analytics()
+RETURNS JSON AS $$
+    WITH book AS (
+        SELECT
+            COALESCE(status, 'unknown') AS status,
+            COALESCE(loan_type, 'unknown') AS loan_type,
+            COALESCE(loan_amount, 0) AS loan_amount,
+            COALESCE(amount_paid, 0) AS amount_paid
+        FROM clients
+        WHERE archived = FALSE
+    )
+    SELECT json_build_object(
+        'totals', (
+            SELECT json_build_object(
+                'totalClients', COUNT(*),
+                'totalLoanAmount', COALESCE(SUM(loan_amount), 0),
+                'totalAmountPaid', COALESCE(SUM(amount_paid), 0)
+            )
+            FROM book
+        ),
+        'statuses', COALESCE((
+            SELECT json_agg(json_build_object('status', status, 'count', count))
+            FROM (SELECT status, COUNT(*) AS count FROM book GROUP BY status) s
+        ), '[]'::json),
+        'loanTypes', COALESCE((
+            SELECT json_agg(json_build_object(
+                'type', loan_type,
+                'count', count,
+                'totalAmount', total_amount,
+                'totalPaid', total_paid
+            ))
+            FROM (
+                SELECT loan_type, COUNT(*) AS count,
+                       SUM(loan_amount) AS total_amount,
+                       SUM(amount_paid) AS total_paid
+                FROM book
+                GROUP BY loan_type
+            ) t
+        ), '[]'::json)
+    );
+$$ LANGUAGE sql STABLE;
+
+-- Verify the function returns the expected shape
+SELECT get_dashboard_analytics();
@@ -0,0 +1,19 @@
+-- Case-insensitive duplicate email lookup for bulk client imports
+-- Run this in your Supabase SQL Editor
+-- Called by SupabaseService.import_clients_bulk via rpc('find_existing_client_emails')
+
+-- Lets lower(email) = ANY(...) use an index instead of scanning clients
+CREATE INDEX IF NOT EXISTS idx_clients_email_lower ON clients (lower(email));
+
+-- Returns the lowercased emails from p_emails that already belong to a client
+CREATE OR REPLACE FUNCTION find_existing_client_emails(p_emails TEXT[])
+RETURNS SETOF TEXT AS $$
+    SELECT DISTINCT lower(email)
+    FROM clients
+    WHERE lower(email) = ANY (SELECT lower(e) FROM unnest(p_emails) AS e);
+$$ LANGUAGE sql STABLE;
+
+-- Verify the function exists
+SELECT proname, pg_get_function_arguments(oid)
+FROM pg_proc
+WHERE proname = 'find_existing_client_emails';
@@ -0,0 +1,33 @@
+-- Indexes for the filtered, keyset-paginated /api/clients listing
+-- Run this in your Supabase SQL Editor
+
+-- Keyset pagination: ORDER BY created_at DESC, id DESC over non-archived clients
+CREATE INDEX IF NOT EXISTS idx_clients_listing
+    ON clients (created_at DESC, id DESC)
+    WHERE archived = FALSE;
+
+-- Full-book listing (include_archived=true)
+CREATE INDEX IF NOT EXISTS idx_clients_created_at_id ON clients (created_at DESC, id DESC);
+
+-- Server-side filters (status and due_date already have indexes)
+CREATE INDEX IF NOT EXISTS idx_clients_loan_type ON clients(loan_type);
+
+-- Scheduled status sweep: UPDATE ... WHERE status = ? AND due_date < / BETWEEN ? over non-archived clients
+CREATE INDEX IF NOT EXISTS idx_clients_status_due_date
+    ON clients (status, due_date)
+    WHERE archived = FALSE;
+
+-- Payment due notifications: due_date = tomorrow uses idx_clients_due_date (add_missing_columns.sql);
+-- the month-end fallback for clients without a due date uses this one
+CREATE INDEX IF NOT EXISTS idx_clients_no_due_date
+    ON clients (id)
+    WHERE due_date IS NULL AND archived = FALSE;
+
+-- Conditional GETs (ETag): latest updated_at for the clients version check
+CREATE INDEX IF NOT EXISTS idx_clients_updated_at ON clients (updated_at DESC);
+
+-- Verify the indexes
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'clients'
+ORDER BY indexname;
@@ -0,0 +1,42 @@
+-- Change counter for the clients table
+-- Run this in your Supabase SQL Editor
+-- Read by SupabaseService.get_clients_version (the ETag of /api/clients and /api/analytics)
+--
+-- A statement-level trigger bumps clients' row in table_versions on every insert,
+-- update, delete and truncate, in the same transaction as the write. Reading the
+-- version is then a primary key lookup, instead of count='exact' over the whole
+-- clients table on every conditional GET. Writers to clients briefly queue on the
+-- one counter row until they commit, which is fine at this CRM's write rate.
+-- Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Disable RLS for the version table (same as clients table)
+ALTER TABLE table_versions DISABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION bump_table_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version, updated_at)
+    VALUES (TG_TABLE_NAME, 1, NOW())
+    ON CONFLICT (table_name) DO UPDATE
+        SET version = table_versions.version + 1, updated_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS clients_version_trigger ON clients;
+CREATE TRIGGER clients_version_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON clients
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+-- Seed the counter so it is read from the first request
+INSERT INTO table_versions (table_name, version) VALUES ('clients', 1)
+ON CONFLICT (table_name) DO NOTHING;
+
+-- Verify the counter
+SELECT * FROM table_versions;
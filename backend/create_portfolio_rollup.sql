@@ -0,0 +1,149 @@
+-- Materialized portfolio rollup for the dashboard
+-- Run this in your Supabase SQL Editor (after create_analytics_function.sql)
+--
+-- One row per (dimension, key):
+--   ('total', 'all')            - whole non-archived book
+--   ('status', <status>)        - per-status counts and sums
+--   ('loan_type', <loan_type>)  - per-loan-type counts and sums
+-- Triggers on clients apply every insert/update/delete in the same transaction
+-- as the write, so the rollup can't miss or race a change. SupabaseService
+-- only reads this table for /api/analytics. rebuild_portfolio_rollup()
+-- re-seeds it (e.g. after loading data with the triggers disabled).
+-- Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS portfolio_rollup (
+    dimension VARCHAR(20) NOT NULL,
+    key VARCHAR(50) NOT NULL,
+    client_count INTEGER NOT NULL DEFAULT 0,
+    loan_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    amount_paid DECIMAL(14,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (dimension, key)
+);
+
+-- Disable RLS for rollup table (same as clients table)
+ALTER TABLE portfolio_rollup DISABLE ROW LEVEL SECURITY;
+
+-- Apply a batch of signed client contributions atomically
+-- deltas: [{"status": ..., "loan_type": ..., "loan_amount": ..., "amount_paid": ..., "sign": 1 | -1}, ...]
+CREATE OR REPLACE FUNCTION apply_portfolio_deltas(deltas JSON)
+RETURNS VOID AS $$
+    INSERT INTO portfolio_rollup (dimension, key, client_count, loan_amount, amount_paid, updated_at)
+    SELECT dimension, key,
+           SUM(sign),
+           SUM(sign * loan_amount),
+           SUM(sign * amount_paid),
+           NOW()
+    FROM (
+        SELECT d.sign,
+               COALESCE(d.loan_amount, 0) AS loan_amount,
+               COALESCE(d.amount_paid, 0) AS amount_paid,
+               x.dimension, x.key
+        FROM json_to_recordset(deltas) AS d(status TEXT, loan_type TEXT, loan_amount NUMERIC, amount_paid NUMERIC, sign INTEGER)
+        CROSS JOIN LATERAL (VALUES
+            ('total', 'all'),
+            ('status', COALESCE(d.status, 'unknown')),
+            ('loan_type', COALESCE(d.loan_type, 'unknown'))
+        ) AS x(dimension, key)
+    ) expanded
+    GROUP BY dimension, key
+    ON CONFLICT (dimension, key) DO UPDATE SET
+        client_count = portfolio_rollup.client_count + EXCLUDED.client_count,
+        loan_amount = portfolio_rollup.loan_amount + EXCLUDED.loan_amount,
+        amount_paid = portfolio_rollup.amount_paid + EXCLUDED.amount_paid,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+-- Recompute the whole rollup from the clients table
+CREATE OR REPLACE FUNCTION rebuild_portfolio_rollup()
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM portfolio_rollup;
+
+    INSERT INTO portfolio_rollup (dimension, key, client_count, loan_amount, amount_paid)
+    SELECT 'total', 'all', COUNT(*), COALESCE(SUM(loan_amount), 0), COALESCE(SUM(amount_paid), 0)
+    FROM clients
+    WHERE archived = FALSE;
+
+    INSERT INTO portfolio_rollup (dimension, key, client_count, loan_amount, amount_paid)
+    SELECT 'status', COALESCE(status, 'unknown'), COUNT(*), COALESCE(SUM(loan_amount), 0), COALESCE(SUM(amount_paid), 0)
+    FROM clients
+    WHERE archived = FALSE
+    GROUP BY COALESCE(status, 'unknown');
+
+    INSERT INTO portfolio_rollup (dimension, key, client_count, loan_amount, amount_paid)
+    SELECT 'loan_type', COALESCE(loan_type, 'unknown'), COUNT(*), COALESCE(SUM(loan_amount), 0), COALESCE(SUM(amount_paid), 0)
+    FROM clients
+    WHERE archived = FALSE
+    GROUP BY COALESCE(loan_type, 'unknown');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level trigger body: turns the changed rows into signed deltas.
+-- Archived rows don't count towards the book (as in rebuild_portfolio_rollup).
+CREATE OR REPLACE FUNCTION apply_client_rollup_changes()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_deltas JSON;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT json_agg(json_build_object('status', status, 'loan_type', loan_type,
+                                          'loan_amount', loan_amount, 'amount_paid', amount_paid, 'sign', 1))
+        INTO v_deltas
+        FROM new_rows
+        WHERE archived = FALSE;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT json_agg(json_build_object('status', status, 'loan_type', loan_type,
+                                          'loan_amount', loan_amount, 'amount_paid', amount_paid, 'sign', -1))
+        INTO v_deltas
+        FROM old_rows
+        WHERE archived = FALSE;
+    ELSE
+        -- Only rows whose rollup columns changed; notes/contact edits don't touch the rollup
+        SELECT json_agg(d) INTO v_deltas
+        FROM (
+            SELECT o.status, o.loan_type, o.loan_amount, o.amount_paid, -1 AS sign
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE o.archived = FALSE
+              AND (o.status, o.loan_type, o.loan_amount, o.amount_paid, o.archived)
+                  IS DISTINCT FROM (n.status, n.loan_type, n.loan_amount, n.amount_paid, n.archived)
+            UNION ALL
+            SELECT n.status, n.loan_type, n.loan_amount, n.amount_paid, 1 AS sign
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.archived = FALSE
+              AND (o.status, o.loan_type, o.loan_amount, o.amount_paid, o.archived)
+                  IS DISTINCT FROM (n.status, n.loan_type, n.loan_amount, n.amount_paid, n.archived)
+        ) d;
+    END IF;
+
+    IF v_deltas IS NOT NULL THEN
+        PERFORM apply_portfolio_deltas(v_deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One trigger per event: transition tables need a single-event trigger
+DROP TRIGGER IF EXISTS clients_rollup_insert ON clients;
+CREATE TRIGGER clients_rollup_insert
+    AFTER INSERT ON clients
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_client_rollup_changes();
+
+DROP TRIGGER IF EXISTS clients_rollup_update ON clients;
+CREATE TRIGGER clients_rollup_update
+    AFTER UPDATE ON clients
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_client_rollup_changes();
+
+DROP TRIGGER IF EXISTS clients_rollup_delete ON clients;
+CREATE TRIGGER clients_rollup_delete
+    AFTER DELETE ON clients
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_client_rollup_changes();
+
+-- Seed the rollup from existing data
+SELECT rebuild_portfolio_rollup();
+
+-- Verify the rollup
+SELECT * FROM portfolio_rollup ORDER BY dimension, key;
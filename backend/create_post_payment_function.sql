@@ -0,0 +1,138 @@
+-- Atomic payment posting
+-- Run this in your Supabase SQL Editor (after create_payments_table.sql)
+-- Called by SupabaseService.add_payment via rpc('post_payment')
+--
+-- Locks the client row, caps the payment at the remaining balance (raising
+-- when nothing is left to pay), inserts the payment, increments amount_paid
+-- and applies the status/archive transition in one transaction, so
+-- concurrent payments can't lose updates.
+-- Returns {"client": <updated row>, "previous": <rollup columns before>, "payment": <payment row>}
+-- or NULL when the client does not exist.
+
+CREATE OR REPLACE FUNCTION post_payment(
+    p_client_id TEXT,
+    p_amount NUMERIC,
+    p_payment_date DATE DEFAULT CURRENT_DATE,
+    p_notes TEXT DEFAULT NULL
+)
+RETURNS JSON AS $$
+DECLARE
+    v_client clients%ROWTYPE;
+    v_previous JSON;
+    v_payment payments%ROWTYPE;
+    v_total_due NUMERIC;
+    v_amount NUMERIC;
+    v_new_amount_paid NUMERIC;
+    v_remaining NUMERIC;
+    v_status VARCHAR(20);
+BEGIN
+    SELECT * INTO v_client
+    FROM clients
+    -- Only numeric ids are cast; AND doesn't guarantee the regex is checked first, CASE does
+    WHERE client_uuid = p_client_id
+       OR id = CASE WHEN p_client_id ~ '^[0-9]+$' THEN p_client_id::INTEGER END
+    LIMIT 1
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    v_previous := json_build_object(
+        'status', v_client.status,
+        'loan_type', v_client.loan_type,
+        'loan_amount', v_client.loan_amount,
+        'amount_paid', v_client.amount_paid,
+        'archived', v_client.archived
+    );
+
+    -- Total due is principal plus 50% interest; never accept more than what is left
+    v_total_due := COALESCE(v_client.loan_amount, 0) * 1.5;
+    v_amount := LEAST(p_amount, v_total_due - COALESCE(v_client.amount_paid, 0));
+    IF v_amount <= 0 THEN
+        RAISE EXCEPTION 'Client has no outstanding balance';
+    END IF;
+
+    INSERT INTO payments (client_id, amount, payment_date, created_at, notes)
+    VALUES (
+        p_client_id,
+        v_amount,
+        COALESCE(p_payment_date, CURRENT_DATE),
+        NOW(),
+        COALESCE(p_notes, 'Payment of ' || v_amount)
+    )
+    RETURNING * INTO v_payment;
+
+    v_new_amount_paid := COALESCE(v_client.amount_paid, 0) + v_amount;
+    v_remaining := v_total_due - v_new_amount_paid;
+
+    IF v_remaining <= 0 THEN
+        v_status := 'paid';
+    ELSIF v_remaining < v_total_due * 0.3 THEN
+        v_status := 'active';
+    ELSE
+        v_status := 'repayment-due';
+    END IF;
+
+    UPDATE clients SET
+        amount_paid = v_new_amount_paid,
+        last_payment_date = COALESCE(p_payment_date, CURRENT_DATE),
+        status = v_status,
+        -- Auto-archive fully paid clients
+        archived = CASE WHEN v_status = 'paid' THEN TRUE ELSE archived END,
+        updated_at = NOW()
+    WHERE id = v_client.id
+    RETURNING * INTO v_client;
+
+    RETURN json_build_object(
+        'client', row_to_json(v_client),
+        'previous', v_previous,
+        'payment', row_to_json(v_payment)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Post many payments in one call (SupabaseService.add_payments_bulk)
+-- p_payments: [{"row": <index>, "client_id": ..., "amount": ..., "payment_date": ..., "notes": ...}, ...]
+-- Each payment goes through post_payment, so balances are incremented under the
+-- client row lock. A payment that fails (unknown client, nothing left to pay,
+-- any error) is rolled back on its own and reported; the others still post.
+-- Returns [{"row", "client", "payment"} | {"row", "error"}, ...]
+CREATE OR REPLACE FUNCTION post_payments_bulk(p_payments JSON)
+RETURNS JSON AS $$
+DECLARE
+    v_item RECORD;
+    v_posted JSON;
+    v_results JSON[] := '{}';
+BEGIN
+    -- Per-client order keeps payments for one client in request order and
+    -- takes row locks in a consistent order across concurrent bulk posts
+    FOR v_item IN
+        SELECT *
+        FROM json_to_recordset(p_payments) AS p("row" INTEGER, client_id TEXT, amount NUMERIC,
+                                                payment_date DATE, notes TEXT)
+        ORDER BY client_id, "row"
+    LOOP
+        BEGIN
+            v_posted := post_payment(v_item.client_id, v_item.amount, v_item.payment_date, v_item.notes);
+            IF v_posted IS NULL THEN
+                RAISE EXCEPTION 'Client with ID % not found', v_item.client_id;
+            END IF;
+            v_results := v_results || json_build_object(
+                'row', v_item."row",
+                'client', v_posted->'client',
+                'payment', v_posted->'payment'
+            );
+        EXCEPTION WHEN OTHERS THEN
+            v_results := v_results || json_build_object('row', v_item."row", 'error', SQLERRM);
+        END;
+    END LOOP;
+
+    RETURN array_to_json(v_results);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Verify the functions exist
+SELECT proname, pg_get_function_arguments(oid)
+FROM pg_proc
+WHERE proname IN ('post_payment', 'post_payments_bulk');
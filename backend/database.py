@@ -9,10 +9,38 @@ import os
 from dotenv import load_dotenv
 from models import ClientModel, PaymentModel, DocumentModel, NoteModel, UserModel
 from mongodb_api_wrapper import mongo_api
+from analytics import format_analytics, rollup_from_aggregates
 
 # Load environment variables
 load_dotenv()
 
+# One round trip for every dashboard aggregate: totals, per-status counts, per-loan-type sums
+ANALYTICS_PIPELINE = [
+    {"$facet": {
+        "totals": [
+            {"$group": {
+                "_id": None,
+                "totalClients": {"$sum": 1},
+                "totalLoanAmount": {"$sum": "$loanAmount"},
+                "totalAmountPaid": {"$sum": "$amountPaid"}
+            }}
+        ],
+        "statuses": [
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            {"$project": {"_id": 0, "status": "$_id", "count": 1}}
+        ],
+        "loanTypes": [
+            {"$group": {
+                "_id": "$loanType",
+                "count": {"$sum": 1},
+                "totalAmount": {"$sum": "$loanAmount"},
+                "totalPaid": {"$sum": "$amountPaid"}
+            }},
+            {"$project": {"_id": 0, "type": "$_id", "count": 1, "totalAmount": 1, "totalPaid": 1}}
+        ]
+    }}
+]
+
 class DatabaseService:
     """Database service using MongoDB Atlas Data API"""
     
@@ -22,6 +50,15 @@ class DatabaseService:
             print("⚠️ Warning: MONGODB_API_KEY not found. Please set it in your environment.")
         else:
             print(f"✅ MongoDB Data API service initialized")
+        
+        # The Data API can't create indexes; bootstrap them over MONGODB_URI when asked to
+        if os.getenv('MONGODB_ENSURE_INDEXES', 'false').lower() == 'true':
+            try:
+                from mongo_indexes import bootstrap_indexes
+                if not bootstrap_indexes():
+                    print("⚠️ Warning: some Mongo query shapes still do collection scans")
+            except Exception as e:
+                print(f"⚠️ Warning: Could not bootstrap Mongo indexes: {e}")
     
     def is_connected(self) -> bool:
         """Check if database is connected"""
@@ -65,8 +102,7 @@ class DatabaseService:
     def get_all_clients(self) -> List[Dict[str, Any]]:
         """Get all clients"""
         try:
-            clients = mongo_api.find_all('clients')
-            return clients or []
+            return list(mongo_api.find_iter('clients'))
             
         except Exception as e:
             print(f"❌ Error getting clients: {e}")
@@ -88,6 +124,13 @@ class DatabaseService:
             print(f"❌ Error getting client: {e}")
             raise
     
+    def _client_filters(self, client_id: str) -> List[Dict[str, Any]]:
+        """Filters that may identify a client: custom id first, then MongoDB ObjectId"""
+        filters = [{"id": client_id}]
+        if len(client_id) == 24:
+            filters.append({"_id": client_id})
+        return filters
+    
     def update_client(self, client_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a client"""
         try:
@@ -149,33 +192,33 @@ class DatabaseService:
             payment_data['clientId'] = client_id
             payment = PaymentModel(payment_data)
             
+            payment_dict = payment.to_dict()
+            
             # Insert payment using API
-            mongo_api.insert_one('payments', payment.to_dict())
-            
-            # Update client's amount paid
-            client = self.get_client_by_id(client_id)
-            if client:
-                new_amount_paid = client.get('amountPaid', 0) + payment.amount
-                
-                # Update client
-                update_data = {
-                    'amountPaid': new_amount_paid,
-                    'lastPaymentDate': payment.paymentDate
-                }
-                
-                # Add to payment history
-                payment_history = client.get('paymentHistory', [])
-                payment_history.append(payment.to_dict())
-                update_data['paymentHistory'] = payment_history
-                
-                # Auto-update status if needed
-                total_due = client.get('loanAmount', 0) * 1.5
-                if new_amount_paid >= total_due:
-                    update_data['status'] = 'paid'
-                
-                return self.update_client(client_id, update_data)
+            mongo_api.insert_one('payments', payment_dict)
+            
+            # Increment amount paid and append to payment history in one atomic update
+            now = datetime.now(timezone.utc).isoformat()
+            update_doc = {
+                "$inc": {"amountPaid": payment.amount},
+                "$push": {"paymentHistory": payment_dict},
+                "$set": {"lastPaymentDate": payment.paymentDate, "updatedAt": now}
+            }
             
-            return None
+            for filter_doc in self._client_filters(client_id):
+                client = mongo_api.find_one_and_update('clients', filter_doc, update_doc)
+                if client:
+                    break
+            else:
+                return None
+            
+            # Auto-update status if needed
+            total_due = client.get('loanAmount', 0) * 1.5
+            if client.get('amountPaid', 0) >= total_due and client.get('status') != 'paid':
+                mongo_api.update_one('clients', filter_doc, {"$set": {"status": "paid"}})
+                client['status'] = 'paid'
+            
+            return client
             
         except Exception as e:
             print(f"❌ Error adding payment: {e}")
@@ -184,10 +227,8 @@ class DatabaseService:
     def get_client_payments(self, client_id: str) -> List[Dict[str, Any]]:
         """Get all payments for a client"""
         try:
-            payments = mongo_api.find_all('payments')
-            # Filter by client ID
-            client_payments = [p for p in payments if p.get('clientId') == client_id]
-            return client_payments
+            # Filter by client ID on the server
+            return list(mongo_api.find_iter('payments', {"clientId": client_id}))
             
         except Exception as e:
             print(f"❌ Error getting payments: {e}")
@@ -204,12 +245,14 @@ class DatabaseService:
             # Insert note using API
             inserted_id = mongo_api.insert_one('notes', note_dict)
             
-            # Add to client's notes array
-            client = self.get_client_by_id(client_id)
-            if client:
-                notes = client.get('notes', [])
-                notes.append(note_dict)
-                self.update_client(client_id, {'notes': notes})
+            # Append to the client's notes array in place
+            update_doc = {
+                "$push": {"notes": note_dict},
+                "$set": {"updatedAt": datetime.now(timezone.utc).isoformat()}
+            }
+            for filter_doc in self._client_filters(client_id):
+                if mongo_api.update_one('clients', filter_doc, update_doc):
+                    break
             
             if inserted_id:
                 note_dict['_id'] = inserted_id
@@ -220,115 +263,33 @@ class DatabaseService:
             print(f"❌ Error adding note: {e}")
             raise
     
-    # Analytics operations (simplified for API)
-    def get_analytics_data(self) -> Dict[str, Any]:
-        """Get analytics data for dashboard"""
+    # Analytics operations
+    def get_dashboard_analytics(self) -> Dict[str, Any]:
+        """Get summary, status breakdown and loan type breakdown from one $group pipeline"""
         try:
-            clients = mongo_api.find_all('clients')
-            
-            if not clients:
-                return {
-                    'totalClients': 0,
-                    'totalLoanAmount': 0,
-                    'totalAmountPaid': 0,
-                    'totalAmountDue': 0,
-                    'totalOutstanding': 0,
-                    'activeLoans': 0,
-                    'overdueCount': 0,
-                    'paidCount': 0,
-                    'repaymentRate': 0,
-                    'avgLoanAmount': 0
-                }
-            
-            # Calculate metrics
-            total_clients = len(clients)
-            total_loan_amount = sum(c.get('loanAmount', 0) for c in clients)
-            total_amount_paid = sum(c.get('amountPaid', 0) for c in clients)
-            total_due = total_loan_amount * 1.5
-            total_outstanding = max(0, total_due - total_amount_paid)
-            
-            active_statuses = ['active', 'repayment-due', 'overdue']
-            active_loans = len([c for c in clients if c.get('status') in active_statuses])
-            overdue_count = len([c for c in clients if c.get('status') == 'overdue'])
-            paid_count = len([c for c in clients if c.get('status') == 'paid'])
-            
-            repayment_rate = (total_amount_paid / total_due * 100) if total_due > 0 else 0
-            avg_loan_amount = total_loan_amount / total_clients if total_clients > 0 else 0
-            
-            return {
-                'totalClients': total_clients,
-                'totalLoanAmount': total_loan_amount,
-                'totalAmountPaid': total_amount_paid,
-                'totalAmountDue': total_due,
-                'totalOutstanding': total_outstanding,
-                'activeLoans': active_loans,
-                'overdueCount': overdue_count,
-                'paidCount': paid_count,
-                'repaymentRate': repayment_rate,
-                'avgLoanAmount': avg_loan_amount
-            }
+            result = mongo_api.aggregate('clients', ANALYTICS_PIPELINE)
+            facets = result[0] if result else {}
+            totals = (facets.get('totals') or [{}])[0]
+            
+            rollup = rollup_from_aggregates(totals, facets.get('statuses'), facets.get('loanTypes'))
+            return format_analytics(rollup)
             
         except Exception as e:
             print(f"❌ Error getting analytics: {e}")
             raise
     
+    def get_analytics_data(self) -> Dict[str, Any]:
+        """Get analytics data for dashboard"""
+        return self.get_dashboard_analytics()['summary']
+    
     def get_status_breakdown(self) -> List[Dict[str, Any]]:
         """Get client count by status"""
-        try:
-            clients = mongo_api.find_all('clients')
-            status_counts = {}
-            
-            for client in clients:
-                status = client.get('status', 'unknown')
-                status_counts[status] = status_counts.get(status, 0) + 1
-            
-            return [{"status": status, "count": count} for status, count in status_counts.items()]
-            
-        except Exception as e:
-            print(f"❌ Error getting status breakdown: {e}")
-            raise
+        return self.get_dashboard_analytics()['statusBreakdown']
     
     def get_loan_type_breakdown(self) -> List[Dict[str, Any]]:
         """Get loan amount by loan type"""
-        try:
-            clients = mongo_api.find_all('clients')
-            type_data = {}
-            
-            for client in clients:
-                loan_type = client.get('loanType', 'unknown')
-                loan_amount = client.get('loanAmount', 0)
-                amount_paid = client.get('amountPaid', 0)
-                
-                if loan_type not in type_data:
-                    type_data[loan_type] = {
-                        'count': 0,
-                        'totalAmount': 0,
-                        'totalPaid': 0
-                    }
-                
-                type_data[loan_type]['count'] += 1
-                type_data[loan_type]['totalAmount'] += loan_amount
-                type_data[loan_type]['totalPaid'] += amount_paid
-            
-            result = []
-            for loan_type, data in type_data.items():
-                total_due = data['totalAmount'] * 1.5
-                outstanding = max(0, total_due - data['totalPaid'])
-                
-                result.append({
-                    "type": loan_type,
-                    "count": data['count'],
-                    "amount": data['totalAmount'],
-                    "totalDue": total_due,
-                    "outstanding": outstanding
-                })
-            
-            return result
-            
-        except Exception as e:
-            print(f"❌ Error getting loan type breakdown: {e}")
-            raise
-
+        return self.get_dashboard_analytics()['loanTypeBreakdown']
+    
     # User Management Methods (simplified for API)
     def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Create a new user"""
@@ -383,7 +344,7 @@ class DatabaseService:
     def get_all_users(self) -> List[Dict[str, Any]]:
         """Get all users"""
         try:
-            return mongo_api.find_all('users') or []
+            return list(mongo_api.find_iter('users'))
             
         except Exception as e:
             print(f"❌ Error getting all users: {e}")
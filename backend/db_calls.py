@@ -0,0 +1,149 @@
+"""
+Database round-trip counting for the Cashflow CRM API
+Counts the PostgREST HTTP requests SupabaseService makes (or the SQL statements the
+SQLAlchemy app in api/ runs) while handling each request, returns the count in an
+X-DB-Calls header and logs query shapes repeated within one request (the usual sign of
+an N+1 loop). Tests can pin a round-trip budget with assert_db_calls.
+"""
+
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+# Log a query shape once it is issued this many times within one request
+REPEATED_QUERY_THRESHOLD = int(os.getenv('DB_REPEATED_QUERY_THRESHOLD', '2'))
+
+# Query parameters that are part of a query's shape as-is; for the rest only the operator is kept
+SHAPE_VERBATIM_PARAMS = {'select', 'order'}
+SHAPE_KEY_ONLY_PARAMS = {'limit', 'offset', 'or', 'and', 'columns', 'on_conflict'}
+
+class DbCallTracker:
+    """Round trips made while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.shapes: Counter = Counter()
+
+    def record(self, shape: str):
+        self.count += 1
+        self.shapes[shape] += 1
+
+    def repeated(self, threshold: int = REPEATED_QUERY_THRESHOLD) -> Dict[str, int]:
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+_current: ContextVar[Optional[DbCallTracker]] = ContextVar('db_call_tracker', default=None)
+
+# Open track_db_calls blocks, each collecting the requests that finish inside it
+_recorders: List[list] = []
+_recorders_lock = threading.Lock()
+
+def record_db_call(shape: str):
+    """Count one round trip against the request being handled (no-op outside requests)"""
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.record(shape)
+
+def postgrest_shape(method: str, path: str, query: str) -> str:
+    """A PostgREST request with the filter values stripped, e.g. GET /rest/v1/clients?id=eq&select=*"""
+    parts = []
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        if key in SHAPE_VERBATIM_PARAMS:
+            parts.append(f"{key}={value}")
+        elif key in SHAPE_KEY_ONLY_PARAMS:
+            parts.append(key)
+        else:
+            # eq.5 / in.(a,b) / not.is.null -> eq / in / not
+            parts.append(f"{key}={value.split('.', 1)[0]}")
+    return f"{method} {path}" + ("?" + "&".join(sorted(parts)) if parts else "")
+
+def install_httpx_counter(session):
+    """Count every request an httpx client (the PostgREST session) sends"""
+    hooks = session.event_hooks.setdefault('request', [])
+    if _count_httpx_request not in hooks:
+        hooks.append(_count_httpx_request)
+
+def _count_httpx_request(request):
+    record_db_call(postgrest_shape(request.method, request.url.path, request.url.query.decode('ascii', 'replace')))
+
+def install_sqlalchemy_counter(target=None):
+    """Count every statement SQLAlchemy runs on target (an Engine; all engines by default)
+
+    Statements are parameterized, so the SQL text is the query shape.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    target = target if target is not None else Engine
+    if not event.contains(target, 'before_cursor_execute', _count_sqlalchemy_statement):
+        event.listen(target, 'before_cursor_execute', _count_sqlalchemy_statement)
+
+def _count_sqlalchemy_statement(conn, cursor, statement, parameters, context, executemany):
+    record_db_call(' '.join(statement.split())[:200])
+
+@contextmanager
+def track_db_calls():
+    """Collect (route, calls, repeated shapes) for every request that finishes inside the block"""
+    finished = []
+    with _recorders_lock:
+        _recorders.append(finished)
+    try:
+        yield finished
+    finally:
+        with _recorders_lock:
+            _recorders.remove(finished)
+
+@contextmanager
+def assert_db_calls(max_calls: int):
+    """Test helper: fail if any request made inside the block takes more than max_calls round trips
+
+        with assert_db_calls(2):
+            client.get('/api/clients/abc')
+    """
+    with track_db_calls() as finished:
+        yield finished
+    over = [entry for entry in finished if entry['calls'] > max_calls]
+    if over:
+        details = "; ".join(f"{entry['route']}: {entry['calls']} calls {dict(entry['shapes'])}" for entry in over)
+        raise AssertionError(f"DB round-trip budget of {max_calls} exceeded: {details}")
+
+def init_db_call_tracking(app, header: str = 'X-DB-Calls'):
+    """Track round trips per request, report them in a response header and log repeated shapes"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_db_call_tracking():
+        g.db_call_token = _current.set(DbCallTracker())
+
+    @app.after_request
+    def _report_db_calls(response):
+        tracker = _current.get()
+        if tracker is None:
+            return response
+
+        # Streamed bodies query after this point, so their header only covers the set-up
+        response.headers[header] = str(tracker.count)
+
+        route = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        repeated = tracker.repeated()
+        if repeated:
+            for shape, count in repeated.items():
+                logger.warning("⚠️ %s repeated a query %sx (possible N+1): %s", route, count, shape)
+
+        with _recorders_lock:
+            for finished in _recorders:
+                finished.append({'route': route, 'calls': tracker.count, 'shapes': dict(tracker.shapes),
+                                 'repeated': repeated})
+        return response
+
+    @app.teardown_request
+    def _stop_db_call_tracking(error=None):
+        token = g.pop('db_call_token', None)
+        if token is not None:
+            _current.reset(token)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Bulk import clients/leads from a JSON or CSV file
+Usage: python import_clients.py leads.csv [--batch-size 500] [--no-dedupe] [--report report.json]
+"""
+
+import sys
+import os
+import csv
+import json
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from supabase_database import db_service, BULK_BATCH_SIZE
+
+def read_rows(path):
+    """Read client rows from a .json list (or {"clients": [...]}) or a .csv file"""
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('clients')
+        if not isinstance(data, list):
+            raise ValueError("JSON file must contain a list of clients")
+        return [row for row in data if isinstance(row, dict)]
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+def import_clients(path, batch_size=BULK_BATCH_SIZE, dedupe=True, report=None):
+    try:
+        rows = read_rows(path)
+        print(f"📥 Importing {len(rows)} clients from {path} in batches of {batch_size}...")
+
+        summary = db_service.import_clients_bulk(rows, batch_size=batch_size, dedupe=dedupe)
+
+        print(f"✅ Import finished: {summary['created']} created, {summary['duplicate']} duplicates, "
+              f"{summary['invalid']} invalid, {summary['failed']} failed")
+        for result in summary['results']:
+            if result and result['status'] != 'created':
+                print(f"  - row {result['row']}: {result['status']} ({result.get('error')})")
+
+        if report:
+            with open(report, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+            print(f"📝 Per-row report written to {report}")
+
+        return summary['failed'] == 0
+    except Exception as e:
+        print(f"❌ Import failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import clients/leads into Supabase")
+    parser.add_argument('path', help="JSON or CSV file of clients")
+    parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE, help="rows per insert")
+    parser.add_argument('--no-dedupe', action='store_true', help="skip email/id number duplicate checks")
+    parser.add_argument('--report', help="write the per-row results to this JSON file")
+    args = parser.parse_args()
+
+    sys.exit(0 if import_clients(args.path, max(args.batch_size, 1), not args.no_dedupe, args.report) else 1)
@@ -0,0 +1,132 @@
+"""
+Fast JSON encoding and response compression for the Cashflow CRM API
+Swaps Flask's JSON provider for one backed by orjson and compresses large responses
+with brotli or gzip, whichever the client prefers. orjson and brotli are optional:
+without them the stdlib encoder and gzip are used.
+"""
+
+import gzip
+import logging
+import os
+import zlib
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this go out uncompressed (the headers would eat the saving)
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+
+# Fast settings suited to per-request compression of dynamic JSON
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/html', 'text/plain',
+                          'text/csv', 'text/css', 'application/javascript', 'image/svg+xml'}
+
+if orjson is not None:
+    # Match Flask's output: sorted keys, and datetimes handed to Flask's default (HTTP dates)
+    ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+class OrJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson, falling back to the stdlib for anything it rejects"""
+
+    def _encode(self, obj) -> bytes:
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS)
+            except TypeError:
+                # e.g. integers beyond 64 bits
+                pass
+        return super().dumps(obj).encode('utf-8')
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # Callers asking for specific json.dumps options get the stdlib encoder
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        # Skip the bytes -> str -> bytes round trip of the default implementation
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj), mimetype=self.mimetype)
+
+def _encode_stream(chunks, encoding: str):
+    """Compress a streamed body chunk by chunk so it is never buffered whole"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        compress, finish = compressor.compress, compressor.flush
+
+    try:
+        for chunk in chunks:
+            data = compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def compress_response(response):
+    """after_request hook: brotli/gzip-encode large compressible responses the client accepts"""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    if response.is_streamed:
+        # Streamed dumps are large by definition; compress them on the fly
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding:
+            response.response = _encode_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            _weaken_etag(response)
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = request.accept_encodings.best_match(encodings)
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+def _weaken_etag(response):
+    # The encoded bytes differ per encoding, so a strong validator becomes weak (If-None-Match compares weakly)
+    etag, is_weak = response.get_etag()
+    if etag and not is_weak:
+        response.set_etag(etag, weak=True)
+
+def init_json_responses(app):
+    """Install the orjson provider and response compression on a Flask app"""
+    app.json = OrJSONProvider(app)
+    app.after_request(compress_response)
+    logger.info("⚡ JSON responses: %s, compression: %s above %s bytes",
+                'orjson' if orjson is not None else 'stdlib json',
+                'br, gzip' if brotli is not None else 'gzip', COMPRESS_MIN_SIZE)
@@ -0,0 +1,204 @@
+"""
+Request, database and scheduler metrics for the Cashflow CRM API
+A small dependency-free registry of counters, gauges and histograms rendered in the
+Prometheus text exposition format at /metrics. Values are per process: under gunicorn
+each worker exposes its own, so scrape every worker (or run a single worker per port).
+"""
+
+import functools
+import inspect
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from a cached read up to a slow bulk import
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List['_Metric'] = []
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and self.kind != 'histogram':
+            # Unlabelled counters and gauges are exported as 0 before their first update
+            self._values[()] = 0
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: tuple, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [per-bucket counts (non-cumulative), sum]
+                series = self._values[key] = [[0] * len(self.buckets), 0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+
+    def _render_series(self, key: tuple, value) -> List[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# HTTP requests
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Request latency by route and status',
+                             ('method', 'route', 'status'))
+REQUESTS_IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests currently being handled')
+
+# SupabaseService methods
+DB_CALLS = Counter('supabase_service_calls_total', 'SupabaseService method calls by outcome', ('method', 'outcome'))
+DB_CALL_DURATION = Histogram('supabase_service_call_duration_seconds', 'SupabaseService method duration', ('method',))
+
+# Scheduled jobs
+JOB_DURATION = Histogram('scheduler_job_duration_seconds', 'NotificationScheduler job duration by outcome',
+                         ('job', 'outcome'), buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+
+def instrument_methods(cls):
+    """Class decorator: count and time every public method of a service class"""
+    for name, method in list(vars(cls).items()):
+        # Generators return immediately, so timing the call would only time their creation
+        if name.startswith('_') or not inspect.isfunction(method) or inspect.isgeneratorfunction(method):
+            continue
+        setattr(cls, name, _instrumented(name, method))
+    return cls
+
+def _instrumented(name: str, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = method(*args, **kwargs)
+            outcome = 'ok'
+            return result
+        finally:
+            DB_CALL_DURATION.observe(time.perf_counter() - start, method=name)
+            DB_CALLS.inc(method=name, outcome=outcome)
+    return wrapper
+
+def timed_job(job: str):
+    """Decorator for scheduler jobs: a job fails by raising or by returning False
+
+    Jobs run on the schedule thread, so they catch and log their own errors; returning
+    False is how such a job still gets recorded with outcome="error".
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = func(*args, **kwargs)
+                if result is not False:
+                    outcome = 'ok'
+                return result
+            finally:
+                JOB_DURATION.observe(time.perf_counter() - start, job=job, outcome=outcome)
+        return wrapper
+    return decorator
+
+def init_metrics(app, path: str = '/metrics'):
+    """Time every request, track in-flight requests and serve the metrics at path"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_in_flight = True
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            # The route template, not the raw path, so client ids don't explode the label set
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method,
+                                     route=route, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def _finish_request(error: Optional[BaseException] = None):
+        if g.pop('metrics_in_flight', False):
+            REQUESTS_IN_FLIGHT.dec()
+
+    @app.route(path, methods=['GET'])
+    def metrics_endpoint():
+        return app.response_class(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Resumable, batched migration of the Mongo collections into Supabase
+Streams users, clients, payments and notes out of Mongo (via the Data API) in _id order,
+maps them to the Postgres columns and bulk-writes each batch. Every row carries its Mongo
+_id in a unique mongo_id column (add_mongo_id_columns.sql) and is written with
+ON CONFLICT DO NOTHING, so re-writing a batch never duplicates rows or overwrites edits
+made since. Progress, including the _ids of rows that failed, is checkpointed after every
+batch, so an interrupted run picks up where it stopped and retries the failures.
+Usage: python migrate_mongo_to_supabase.py [--batch-size 500] [--checkpoint path] [--only clients,payments] [--reset]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+from typing import List, Dict, Any
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mongodb_api_wrapper import mongo_api
+from supabase_database import db_service, BULK_BATCH_SIZE
+from client_mapping import prepare_client_record, CLIENT_FIELD_MAPPINGS
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migration_checkpoint.json')
+
+# Migration order: users and clients first so later rows can refer to them
+COLLECTIONS = ['users', 'clients', 'payments', 'notes']
+
+# clients columns a migrated row may carry (everything else in the Mongo document is dropped)
+CLIENT_COLUMNS = set(CLIENT_FIELD_MAPPINGS) | {'client_uuid', 'first_name', 'last_name', 'archived'}
+
+# Unique column holding the source document's _id on every migrated table
+MONGO_ID_COLUMN = 'mongo_id'
+
+def transform_client(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Mongo ClientModel document to a clients row, the same way create_client does"""
+    # Embedded notes live in the notes collection; the clients.notes column is plain text
+    source = {key: value for key, value in doc.items() if key not in ('_id', 'userId', 'notes')}
+    record = prepare_client_record(source)
+    record = {column: value for column, value in record.items() if column in CLIENT_COLUMNS}
+    record[MONGO_ID_COLUMN] = str(doc['_id'])
+
+    # Keep the original timestamps rather than the migration time
+    record['created_at'] = doc.get('createdAt') or record['created_at']
+    record['updated_at'] = doc.get('updatedAt') or record['updated_at']
+    return record
+
+def transform_payment(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Mongo PaymentModel document to a payments row"""
+    record = {
+        MONGO_ID_COLUMN: str(doc['_id']),
+        'client_id': doc.get('clientId'),
+        'amount': doc.get('amount') or 0,
+        'payment_date': doc.get('paymentDate'),
+        'notes': doc.get('notes') or f"Payment of {doc.get('amount') or 0}"
+    }
+    if doc.get('createdAt'):
+        record['created_at'] = doc['createdAt']
+    return record
+
+def transform_note(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Mongo NoteModel document to a notes row"""
+    record = {
+        MONGO_ID_COLUMN: str(doc['_id']),
+        'client_id': doc.get('clientId'),
+        'content': doc.get('content') or '',
+        'note_type': doc.get('noteType') or 'general',
+        'created_by': doc.get('createdBy')
+    }
+    if doc.get('createdAt'):
+        record['created_at'] = doc['createdAt']
+    return record
+
+def transform_user(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Mongo UserModel document to a users row"""
+    name_parts = (doc.get('fullName') or '').split(' ', 1)
+    record = {
+        MONGO_ID_COLUMN: str(doc['_id']),
+        'supabase_id': doc.get('supabaseId') or None,
+        'email': doc.get('email'),
+        'first_name': name_parts[0],
+        'last_name': name_parts[1] if len(name_parts) > 1 else '',
+        'role': doc.get('role') or 'user',
+        'is_active': doc.get('isActive', True)
+    }
+    if doc.get('createdAt'):
+        record['created_at'] = doc['createdAt']
+    if doc.get('updatedAt'):
+        record['updated_at'] = doc['updatedAt']
+    return record
+
+# collection -> (target table, transform)
+MIGRATIONS = {
+    'users': ('users', transform_user),
+    'clients': ('clients', transform_client),
+    'payments': ('payments', transform_payment),
+    'notes': ('notes', transform_note),
+}
+
+# _ids per $in lookup when retrying rows that failed on an earlier run
+RETRY_LOOKUP_SIZE = 200
+
+def object_id(value: Any) -> Any:
+    """The Data API returns ObjectIds as hex strings; turn them back into ObjectIds for filters"""
+    if isinstance(value, str) and len(value) == 24 and all(c in '0123456789abcdef' for c in value):
+        return {'$oid': value}
+    return value
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    """Write the checkpoint atomically so a crash never leaves it half-written"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, path)
+
+def write_batch(table: str, records: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Bulk-write one batch, falling back to row-by-row to isolate bad rows. Returns {mongo_id: error} of failed rows."""
+    def write(rows):
+        # Rows already migrated are left alone, so re-writing a batch is idempotent and never
+        # overwrites edits made in Supabase since
+        db_service.client.table(table).upsert(rows, on_conflict=MONGO_ID_COLUMN, ignore_duplicates=True).execute()
+
+    try:
+        write(records)
+        return {}
+    except Exception as batch_error:
+        print(f"⚠️ Batch write into {table} failed ({batch_error}), retrying row by row...")
+
+    failed = {}
+    for record in records:
+        try:
+            write([record])
+        except Exception as row_error:
+            print(f"❌ Skipped {table} row {record[MONGO_ID_COLUMN]}: {row_error}")
+            failed[record[MONGO_ID_COLUMN]] = str(row_error)
+    return failed
+
+def transform_batch(docs: List[Dict[str, Any]], transform) -> tuple:
+    """(records, {mongo_id: error} of documents the transform rejected)"""
+    records = []
+    failed = {}
+    for doc in docs:
+        try:
+            records.append(transform(doc))
+        except Exception as e:
+            print(f"❌ Could not map document {doc.get('_id')}: {e}")
+            failed[str(doc.get('_id'))] = str(e)
+    return records, failed
+
+def retry_failed(collection: str, state: Dict[str, Any], checkpoint: Dict[str, Any], checkpoint_path: str):
+    """Re-read and re-write the rows an earlier run recorded as failed"""
+    table, transform = MIGRATIONS[collection]
+    failed_ids = list(state['failed'])
+    print(f"🔁 {collection}: retrying {len(failed_ids)} rows that failed before")
+
+    for start in range(0, len(failed_ids), RETRY_LOOKUP_SIZE):
+        chunk = failed_ids[start:start + RETRY_LOOKUP_SIZE]
+        docs = list(mongo_api.find_iter(collection, {'_id': {'$in': [object_id(mongo_id) for mongo_id in chunk]}}))
+        records, failed = transform_batch(docs, transform)
+        if records:
+            failed.update(write_batch(table, records))
+
+        # Documents deleted from Mongo since have nothing left to migrate
+        found = {str(doc['_id']) for doc in docs}
+        for mongo_id in chunk:
+            if mongo_id in failed:
+                state['failed'][mongo_id] = failed[mongo_id]
+            else:
+                if mongo_id in found:
+                    state['written'] += 1
+                state['failed'].pop(mongo_id)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    if state['failed']:
+        print(f"⚠️ {collection}: {len(state['failed'])} rows still failing (kept in {checkpoint_path})")
+
+def migrate_collection(collection: str, checkpoint: Dict[str, Any], checkpoint_path: str, batch_size: int) -> Dict[str, Any]:
+    """Stream one collection into its table from the checkpointed _id onwards"""
+    table, transform = MIGRATIONS[collection]
+    state = checkpoint.setdefault(collection, {'last_id': None, 'read': 0, 'written': 0, 'done': False})
+    # _id -> error of rows that didn't make it; they are retried on every run until they do
+    state.setdefault('failed', {})
+    if state['failed']:
+        retry_failed(collection, state, checkpoint, checkpoint_path)
+    if state['done']:
+        print(f"⏭️ {collection}: already migrated ({state['written']} rows)")
+        return state
+
+    # find_iter pages by _id, so resuming is just "_id greater than the last checkpointed one"
+    filter_doc = {'_id': {'$gt': object_id(state['last_id'])}} if state['last_id'] else None
+    print(f"🚚 Migrating {collection} -> {table}" + (f" (resuming after {state['last_id']})" if state['last_id'] else ""))
+
+    started = time.perf_counter()
+    migrated_this_run = 0
+    batch: List[Dict[str, Any]] = []
+
+    def flush():
+        nonlocal migrated_this_run
+        records, failed = transform_batch(batch, transform)
+        failed.update(write_batch(table, records))
+
+        state['last_id'] = batch[-1]['_id']
+        state['read'] += len(batch)
+        state['written'] += len(batch) - len(failed)
+        state['failed'].update(failed)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        migrated_this_run += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"  - {collection}: {state['read']} read, {state['written']} written "
+              f"({migrated_this_run / elapsed if elapsed > 0 else 0:,.0f} rows/sec)")
+        batch.clear()
+
+    for doc in mongo_api.find_iter(collection, filter_doc, batch_size=batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    state['done'] = True
+    save_checkpoint(checkpoint_path, checkpoint)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {collection}: {migrated_this_run} rows in {elapsed:.1f}s "
+          f"({migrated_this_run / elapsed if elapsed > 0 else 0:,.0f} rows/sec)")
+    return state
+
+def migrate(collections: List[str], batch_size: int = BULK_BATCH_SIZE, checkpoint_path: str = DEFAULT_CHECKPOINT,
+            reset: bool = False) -> bool:
+    try:
+        if reset and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        checkpoint = load_checkpoint(checkpoint_path)
+
+        for collection in collections:
+            migrate_collection(collection, checkpoint, checkpoint_path, batch_size)
+
+        if 'clients' in collections:
+            # Triggers already applied every migrated row to the rollup; a rebuild re-seeds it
+            # in case they were disabled during the load
+            try:
+                db_service.rebuild_portfolio_rollup()
+            except Exception as e:
+                print(f"⚠️ Warning: Could not rebuild portfolio rollup, run rebuild_rollup.py: {e}")
+
+        failed = sum(len(checkpoint[collection].get('failed', {})) for collection in collections)
+        if failed:
+            # Non-zero exit until every row has made it
+            print(f"❌ {failed} rows failed and are recorded in {checkpoint_path}; re-run to retry them")
+            return False
+        print("🎉 Migration complete")
+        return True
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        print(f"   Re-run to resume from {checkpoint_path}")
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate Mongo collections into Supabase")
+    parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE, help="documents per read and insert")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="progress file used to resume")
+    parser.add_argument('--only', help=f"comma-separated subset of {','.join(COLLECTIONS)}")
+    parser.add_argument('--reset', action='store_true', help="ignore any existing checkpoint and start over")
+    args = parser.parse_args()
+
+    collections = [name.strip() for name in args.only.split(',')] if args.only else COLLECTIONS
+    unknown = [name for name in collections if name not in MIGRATIONS]
+    if unknown:
+        parser.error(f"unknown collections: {', '.join(unknown)}")
+
+    sys.exit(0 if migrate(collections, max(args.batch_size, 1), args.checkpoint, args.reset) else 1)
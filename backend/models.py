@@ -162,12 +162,12 @@ class ClientModel(BaseModel):
         # Check if overdue
         elif self.is_overdue() and self.status not in ['paid', 'new-lead']:
             self.status = 'overdue'
-        # Check if payment is due (within 3 days of due date)
+        # Check if payment is due (within REPAYMENT_DUE_WINDOW_DAYS of due date)
         elif self.status == 'active':
             due_date = datetime.strptime(self.dueDate, '%Y-%m-%d').date()
             today = datetime.now().date()
             days_until_due = (due_date - today).days
-            if 0 <= days_until_due <= 3:
+            if 0 <= days_until_due <= REPAYMENT_DUE_WINDOW_DAYS:
                 self.status = 'repayment-due'
 
 class PaymentModel(BaseModel):
@@ -210,6 +210,25 @@ class NoteModel(BaseModel):
         self.createdBy = data.get('createdBy', 'system')
         self.noteType = data.get('noteType', 'general')  # general, payment, status_change, etc.
 
+# Active clients move to repayment-due this many days before their due date
+REPAYMENT_DUE_WINDOW_DAYS = 3
+
+# Date-driven transitions applied by SupabaseService.sweep_client_statuses, in order
+STATUS_SWEEP_TRANSITIONS = [
+    ('active', 'overdue'),
+    ('repayment-due', 'overdue'),
+    ('active', 'repayment-due')
+]
+
+def status_after_payment(total_due: float, amount_paid: float) -> str:
+    """Status a client moves to once amount_paid has been received against total_due"""
+    remaining = total_due - amount_paid
+    if remaining <= 0:
+        return 'paid'
+    if remaining < total_due * 0.3:
+        return 'active'
+    return 'repayment-due'
+
 # Validation schemas
 CLIENT_REQUIRED_FIELDS = ['name', 'email', 'phone', 'loanAmount', 'loanType']
 CLIENT_STATUS_OPTIONS = ['new-lead', 'active', 'repayment-due', 'paid', 'overdue']
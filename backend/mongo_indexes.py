@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Index bootstrap for the Mongo collections used by DatabaseService
+Declares the indexes each collection needs and the query shapes DatabaseService
+issues, creates the indexes and uses explain to warn about shapes that would COLLSCAN.
+
+The Atlas Data API can't manage indexes, so this talks to the cluster (or a local
+mongod stand-in) directly through MONGODB_URI.
+Usage: python mongo_indexes.py [--check-only]
+"""
+
+import sys
+import os
+import argparse
+from typing import List, Dict, Any
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_NAME = os.getenv('DB_NAME', 'cashflowloans')
+
+# Indexes each collection needs, as (keys, options)
+REQUIRED_INDEXES = {
+    'clients': [
+        ([('id', 1)], {'name': 'id_1'}),
+    ],
+    'payments': [
+        # get_client_payments: filter on clientId, find_iter pages by _id
+        ([('clientId', 1), ('_id', 1)], {'name': 'clientId_1__id_1'}),
+    ],
+    'users': [
+        ([('id', 1)], {'name': 'id_1'}),
+        ([('supabaseId', 1)], {'name': 'supabaseId_1'}),
+    ],
+}
+
+# Query shapes DatabaseService issues on the request path (values are placeholders)
+QUERY_SHAPES = [
+    {'name': 'client by id', 'collection': 'clients', 'filter': {'id': 'x'}},
+    {'name': 'client listing page', 'collection': 'clients', 'filter': {'_id': {'$gt': 'x'}}, 'sort': {'_id': 1}},
+    {'name': 'payments for client', 'collection': 'payments', 'filter': {'clientId': 'x'}, 'sort': {'_id': 1}},
+    {'name': 'user by id', 'collection': 'users', 'filter': {'id': 'x'}},
+    {'name': 'user by supabaseId', 'collection': 'users', 'filter': {'supabaseId': 'x'}},
+]
+
+def ensure_indexes(db) -> List[str]:
+    """Create any missing required indexes, returning the names that were declared"""
+    names = []
+    for collection, indexes in REQUIRED_INDEXES.items():
+        for keys, options in indexes:
+            names.append(f"{collection}.{db[collection].create_index(keys, **options)}")
+    return names
+
+def _plan_stages(plan: Any) -> List[str]:
+    """All stage names in an explain plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+def check_query_shapes(db) -> List[Dict[str, Any]]:
+    """Explain every registered query shape and return those whose winning plan is a COLLSCAN"""
+    scans = []
+    for shape in QUERY_SHAPES:
+        command = {'find': shape['collection'], 'filter': shape['filter'], 'limit': 1}
+        if shape.get('sort'):
+            command['sort'] = shape['sort']
+
+        explain = db.command('explain', command, verbosity='queryPlanner')
+        winning_plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+        if 'COLLSCAN' in _plan_stages(winning_plan):
+            print(f"⚠️ Query shape '{shape['name']}' on {shape['collection']} does a COLLSCAN: {shape['filter']}")
+            scans.append(shape)
+        else:
+            print(f"✅ {shape['name']}: {' <- '.join(_plan_stages(winning_plan))}")
+    return scans
+
+def bootstrap_indexes(check_only: bool = False) -> bool:
+    """Ensure indexes exist and verify no registered query shape scans its collection"""
+    from simple_mongodb import get_simple_mongodb_client
+
+    client = get_simple_mongodb_client()
+    try:
+        db = client[DATABASE_NAME]
+        if not check_only:
+            print(f"🔧 Ensuring indexes on {DATABASE_NAME}...")
+            for name in ensure_indexes(db):
+                print(f"  - {name}")
+        return not check_query_shapes(db)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create Mongo indexes and check query shapes for collection scans")
+    parser.add_argument('--check-only', action='store_true', help="only explain the query shapes")
+    args = parser.parse_args()
+
+    try:
+        sys.exit(0 if bootstrap_indexes(args.check_only) else 1)
+    except Exception as e:
+        print(f"❌ Index bootstrap failed: {e}")
+        sys.exit(1)
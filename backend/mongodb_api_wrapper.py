@@ -5,8 +5,29 @@ Uses HTTP requests to MongoDB Atlas Data API instead of direct connection
 
 import requests
 import os
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import time
+import threading
+from typing import List, Dict, Optional, Iterator
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connection pool and retry policy for the Data API session (override via env)
+POOL_SIZE = int(os.getenv('MONGODB_API_POOL_SIZE', 10))
+REQUEST_TIMEOUT = float(os.getenv('MONGODB_API_TIMEOUT', 10))
+MAX_RETRIES = int(os.getenv('MONGODB_API_RETRIES', 3))
+RETRY_BACKOFF = float(os.getenv('MONGODB_API_RETRY_BACKOFF', 0.5))
+
+# Documents fetched per find call by find_iter (the Data API caps a find at 50,000)
+FIND_BATCH_SIZE = int(os.getenv('MONGODB_API_BATCH_SIZE', 1000))
+
+# Read actions are retried on these statuses and on read timeouts
+READ_ACTIONS = frozenset(['find', 'findOne', 'aggregate'])
+READ_RETRY_STATUSES = (429, 502, 503, 504)
+
+# A write whose response was lost (read timeout, 502/503/504) may already have been applied, and
+# insertOne / $inc / $push are not idempotent, so writes are only retried when the request never
+# reached the server (connection errors) or was rejected by rate limiting
+WRITE_RETRY_STATUSES = (429,)
 
 class MongoDBWrapper:
     """Simple MongoDB wrapper using Atlas Data API"""
@@ -22,6 +43,54 @@ class MongoDBWrapper:
             "Content-Type": "application/json",
             "api-key": self.api_key
         }
+        
+        # Keep-alive sessions shared by every collection, so calls reuse pooled TCP/TLS connections
+        self.session = self._create_session(READ_RETRY_STATUSES, retry_reads=True)
+        self.write_session = self._create_session(WRITE_RETRY_STATUSES, retry_reads=False)
+        
+        # action -> {'count', 'errors', 'total_ms', 'max_ms'}
+        self._latency: Dict[str, Dict[str, float]] = {}
+        self._latency_lock = threading.Lock()
+    
+    def _create_session(self, retry_statuses, retry_reads: bool) -> requests.Session:
+        """Build a pooled session that retries the given statuses with exponential backoff
+        
+        With retry_reads=False a request is never resent once it may have reached the server.
+        """
+        retry = Retry(
+            total=MAX_RETRIES,
+            read=None if retry_reads else 0,
+            other=None if retry_reads else 0,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=retry_statuses,
+            allowed_methods=frozenset(['POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+        
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def _record_latency(self, action: str, elapsed_ms: float, failed: bool):
+        """Accumulate per-action call latency"""
+        with self._latency_lock:
+            stats = self._latency.setdefault(action, {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['errors'] += 1 if failed else 0
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+    
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-action call counts, errors and average/max latency in milliseconds"""
+        with self._latency_lock:
+            return {
+                action: {**stats, 'avg_ms': stats['total_ms'] / stats['count'] if stats['count'] else 0.0}
+                for action, stats in self._latency.items()
+            }
     
     def _make_request(self, action: str, collection: str, data: Dict = None) -> Dict:
         """Make request to MongoDB Data API"""
@@ -36,17 +105,84 @@ class MongoDBWrapper:
         if data:
             payload.update(data)
         
+        start = time.perf_counter()
+        failed = False
         try:
-            response = requests.post(url, json=payload, headers=self.headers, timeout=10)
+            session = self.session if action in READ_ACTIONS else self.write_session
+            response = session.post(url, json=payload, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             return response.json()
         except Exception as e:
-            print(f"MongoDB API Error: {e}")
+            failed = True
+            print(f"MongoDB API Error ({action} {collection}): {e}")
             return {"error": str(e)}
+        finally:
+            self._record_latency(action, (time.perf_counter() - start) * 1000, failed)
+    
+    def find_iter(self, collection: str, filter_doc: Dict = None, projection: Dict = None,
+                  sort: Dict = None, batch_size: int = FIND_BATCH_SIZE) -> Iterator[Dict]:
+        """Yield matching documents page by page
+        
+        Without a sort, pages walk _id ranges (_id > last seen) so each page is an index seek.
+        With a sort, pages use skip/limit. Raises if a page request fails.
+        """
+        filter_doc = filter_doc or {}
+        keyset = sort is None
+        
+        # Keyset paging needs _id back even if the caller excluded it
+        strip_id = False
+        if keyset and projection and projection.get('_id') == 0:
+            projection = {field: value for field, value in projection.items() if field != '_id'}
+            strip_id = True
+        
+        last_id = None
+        skip = 0
+        while True:
+            page = {"limit": batch_size, "sort": {"_id": 1} if keyset else sort}
+            if keyset and last_id is not None:
+                page["filter"] = {"$and": [filter_doc, {"_id": {"$gt": last_id}}]} if filter_doc else {"_id": {"$gt": last_id}}
+            else:
+                page["filter"] = filter_doc
+            if not keyset:
+                page["skip"] = skip
+            if projection:
+                page["projection"] = projection
+            
+            result = self._make_request("find", collection, page)
+            if "error" in result:
+                raise Exception(f"find on {collection} failed: {result['error']}")
+            
+            documents = result.get("documents", [])
+            for document in documents:
+                if strip_id:
+                    document = {field: value for field, value in document.items() if field != '_id'}
+                yield document
+            
+            if len(documents) < batch_size:
+                return
+            
+            if keyset:
+                last_id = documents[-1].get('_id')
+                # The Data API returns ObjectIds as hex strings; compare them as ObjectIds again
+                if isinstance(last_id, str) and len(last_id) == 24 and all(c in '0123456789abcdef' for c in last_id):
+                    last_id = {"$oid": last_id}
+            else:
+                skip += len(documents)
+    
+    def find_all(self, collection: str, filter_doc: Dict = None, projection: Dict = None,
+                 sort: Dict = None) -> List[Dict]:
+        """Find all matching documents"""
+        try:
+            return list(self.find_iter(collection, filter_doc, projection, sort))
+        except Exception as e:
+            print(f"MongoDB API Error: {e}")
+            return []
     
-    def find_all(self, collection: str) -> List[Dict]:
-        """Find all documents"""
-        result = self._make_request("find", collection)
+    def aggregate(self, collection: str, pipeline: List[Dict]) -> List[Dict]:
+        """Run an aggregation pipeline and return its result documents. Raises if the request fails."""
+        result = self._make_request("aggregate", collection, {"pipeline": pipeline})
+        if "error" in result:
+            raise Exception(f"aggregate on {collection} failed: {result['error']}")
         return result.get("documents", [])
     
     def find_one(self, collection: str, filter_doc: Dict) -> Optional[Dict]:
@@ -67,6 +203,21 @@ class MongoDBWrapper:
         })
         return result.get("modifiedCount", 0) > 0
     
+    def find_one_and_update(self, collection: str, filter_doc: Dict, update_doc: Dict) -> Optional[Dict]:
+        """Apply an update operator document to one document and return it as updated
+        
+        The Data API has no findOneAndUpdate action, so this is an atomic updateOne
+        followed by a findOne on the same filter (which must not depend on the updated fields).
+        Returns None when nothing matched.
+        """
+        result = self._make_request("updateOne", collection, {
+            "filter": filter_doc,
+            "update": update_doc
+        })
+        if "error" in result or not result.get("matchedCount"):
+            return None
+        return self.find_one(collection, filter_doc)
+    
     def delete_one(self, collection: str, filter_doc: Dict) -> bool:
         """Delete one document"""
         result = self._make_request("deleteOne", collection, {"filter": filter_doc})
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Rebuild the dashboard portfolio rollup from the clients table
+Run this after bulk data fixes or whenever the dashboard totals drift
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from supabase_database import db_service
+
+def rebuild_rollup():
+    try:
+        print("🔄 Rebuilding portfolio rollup...")
+        analytics = db_service.rebuild_portfolio_rollup()
+        summary = analytics['summary']
+        print(f"✅ Rollup rebuilt: {summary['totalClients']} clients, "
+              f"R{summary['totalLoanAmount']:,.2f} loaned, R{summary['totalAmountPaid']:,.2f} paid")
+        for entry in analytics['statusBreakdown']:
+            print(f"  - {entry['status']}: {entry['count']}")
+        return True
+    except Exception as e:
+        print(f"❌ Rollup rebuild failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    sys.exit(0 if rebuild_rollup() else 1)
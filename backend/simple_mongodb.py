@@ -4,19 +4,27 @@ This bypasses complex SSL configurations and uses basic connection methods
 """
 
 from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import hashlib
+import json
 import os
+import tempfile
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_simple_mongodb_client():
-    """
-    Get MongoDB client with simple connection methods
-    """
-    mongo_uri = os.getenv('MONGODB_URI') or os.getenv('MONGO_URI')
-    if not mongo_uri:
-        raise ValueError("MONGODB_URI environment variable not found")
-    
+# Overall time budget for finding a working connection, and per-candidate server selection timeout
+PROBE_DEADLINE = float(os.getenv('MONGODB_PROBE_DEADLINE', '10'))
+PROBE_TIMEOUT_MS = int(os.getenv('MONGODB_PROBE_TIMEOUT_MS', '5000'))
+
+# Remembers which candidate connected last time so later boots try it first. Kept in the temp
+# dir, not the source tree; if it gets cleared the next boot simply probes every candidate.
+PROBE_CACHE_PATH = os.getenv('MONGODB_PROBE_CACHE') or os.path.join(
+    tempfile.gettempdir(), 'cashflow_crm_mongodb_probe_cache.json')
+
+def _connection_candidates(mongo_uri):
+    """(uri variant, options) pairs to try, in the original preference order"""
     # Simple connection methods that work on most platforms
     simple_methods = [
         # Method 1: Basic connection
@@ -33,7 +41,7 @@ def get_simple_mongodb_client():
             'serverSelectionTimeoutMS': 30000
         }
     ]
-    
+
     # Simple URI variants
     uri_variants = [
         # Clean SRV URI
@@ -43,20 +51,113 @@ def get_simple_mongodb_client():
         # URI with basic params
         mongo_uri.split('?')[0] + '?retryWrites=true&w=majority'
     ]
-    
-    for uri in uri_variants:
-        for method in simple_methods:
-            try:
-                print(f"Trying simple connection: {uri[:50]}...")
-                client = MongoClient(uri, **method)
-                client.admin.command('ping')
-                print("✅ Simple MongoDB connection successful!")
-                return client
-            except Exception as e:
-                print(f"❌ Simple connection failed: {str(e)[:100]}")
+
+    candidates = []
+    for uri_index, uri in enumerate(uri_variants):
+        for method_index, method in enumerate(simple_methods):
+            # Variants collapse when the URI has no query string
+            if any(uri == other_uri and method == other_method for _, other_uri, other_method in candidates):
                 continue
+            candidates.append((f"{uri_index}:{method_index}", uri, method))
+    return candidates
+
+def _uri_fingerprint(mongo_uri):
+    """Identify the configured URI in the cache without writing credentials to disk"""
+    return hashlib.sha256(mongo_uri.encode('utf-8')).hexdigest()
+
+def _load_cached_winner(mongo_uri):
+    try:
+        with open(PROBE_CACHE_PATH, encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('uri') == _uri_fingerprint(mongo_uri):
+            return cached.get('candidate')
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _save_cached_winner(mongo_uri, key):
+    try:
+        with open(PROBE_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'uri': _uri_fingerprint(mongo_uri), 'candidate': key}, f)
+    except OSError as e:
+        print(f"⚠️ Could not cache MongoDB connection choice: {e}")
+
+def _probe(uri, method, timeout_ms=PROBE_TIMEOUT_MS):
+    """Connect and ping with server selection capped to the probe timeout"""
+    options = dict(method)
+    options['serverSelectionTimeoutMS'] = min(options.get('serverSelectionTimeoutMS', timeout_ms), timeout_ms)
+    options['connectTimeoutMS'] = min(options.get('connectTimeoutMS', timeout_ms), timeout_ms)
+    client = MongoClient(uri, **options)
+    try:
+        client.admin.command('ping')
+    except Exception:
+        client.close()
+        raise
+    return client
+
+def _probe_concurrently(candidates, deadline):
+    """Probe all candidates at once; return (key, client) for the first to answer, or None"""
+    executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix='mongo-probe')
+    futures = {executor.submit(_probe, uri, method): key for key, uri, method in candidates}
+    winner = None
+
+    pending = set(futures)
+    give_up_at = time.monotonic() + deadline
+    try:
+        while pending and winner is None:
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures[future]
+                if future.exception() is not None:
+                    print(f"❌ Simple connection {key} failed: {str(future.exception())[:100]}")
+                elif winner is None:
+                    winner = (key, future.result())
+                else:
+                    future.result().close()
+    finally:
+        # Probes still running lose; close their clients whenever they finish
+        for future in pending:
+            future.add_done_callback(lambda f: f.exception() is None and f.result().close())
+        executor.shutdown(wait=False)
+    return winner
+
+def get_simple_mongodb_client():
+    """
+    Get MongoDB client with simple connection methods
+    """
+    mongo_uri = os.getenv('MONGODB_URI') or os.getenv('MONGO_URI')
+    if not mongo_uri:
+        raise ValueError("MONGODB_URI environment variable not found")
+    
+    candidates = _connection_candidates(mongo_uri)
+    started = time.monotonic()
+    
+    # Try last boot's winner on its own first (with half the budget); it is almost always still right
+    cached_key = _load_cached_winner(mongo_uri)
+    cached = next((candidate for candidate in candidates if candidate[0] == cached_key), None)
+    if cached:
+        try:
+            print(f"Trying cached connection {cached_key}: {cached[1][:50]}...")
+            client = _probe(cached[1], cached[2], min(PROBE_TIMEOUT_MS, int(PROBE_DEADLINE * 500)))
+            print("✅ Simple MongoDB connection successful!")
+            return client
+        except Exception as e:
+            print(f"❌ Cached connection failed: {str(e)[:100]}")
+            candidates = [candidate for candidate in candidates if candidate[0] != cached_key]
+    
+    remaining = max(PROBE_DEADLINE - (time.monotonic() - started), 0)
+    print(f"Probing {len(candidates)} connection candidates (deadline {remaining:.1f}s)...")
+    winner = _probe_concurrently(candidates, remaining)
+    if winner is None:
+        raise Exception("All simple MongoDB connection methods failed")
     
-    raise Exception("All simple MongoDB connection methods failed")
+    key, client = winner
+    print(f"✅ Simple MongoDB connection successful! ({key})")
+    _save_cached_winner(mongo_uri, key)
+    return client
 
 # Test the connection
 if __name__ == "__main__":
@@ -65,4 +166,4 @@ if __name__ == "__main__":
         print("MongoDB connection test passed!")
         client.close()
     except Exception as e:
-        print(f"MongoDB connection test failed: {e}")
\ No newline at end of file
+        print(f"MongoDB connection test failed: {e}")
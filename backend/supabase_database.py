@@ -4,14 +4,89 @@ Uses PostgreSQL instead of MongoDB for better compatibility
 """
 
 import os
-from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any, Optional
+import json
+import base64
+from datetime import date, datetime, timezone, timedelta
+from typing import List, Dict, Any, Iterator, Optional
 from supabase import create_client, Client
 from dotenv import load_dotenv
+import logging
+from models import (REPAYMENT_DUE_WINDOW_DAYS, STATUS_SWEEP_TRANSITIONS, status_after_payment,
+                    validate_client_data, validate_payment_data)
+from client_mapping import (map_client_row, map_client_rows, prepare_client_record, to_db_fields,
+                            CLIENT_FIELD_COLUMNS, CLIENT_FIELD_MAPPINGS)
+from client_cache import ClientCache, create_client_cache
+from metrics import instrument_methods
+from db_calls import install_httpx_counter
+from analytics import compute_rollup, format_analytics, rollup_from_aggregates, rollup_from_table
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Client fields needed to compute dashboard analytics
+ANALYTICS_FIELDS = ['status', 'loanType', 'loanAmount', 'amountPaid']
+
+# PostgREST / Postgres errors for a table that doesn't exist
+MISSING_TABLE_CODES = ('PGRST205', '42P01')
+
+
+# Max client id -> primary key entries kept by SupabaseService
+CLIENT_PK_CACHE_SIZE = 10000
+
+# Read-through cache of mapped clients (CLIENT_CACHE_TTL=0 disables it). With the default memory
+# backend other workers' writes are only seen once an entry expires; the sqlite (shared by the
+# workers on a host, file at CLIENT_CACHE_LOCATION) and redis (CLIENT_CACHE_LOCATION is the URL)
+# backends share entries and invalidations between workers.
+CLIENT_CACHE_BACKEND = os.getenv('CLIENT_CACHE_BACKEND', 'memory')
+CLIENT_CACHE_LOCATION = os.getenv('CLIENT_CACHE_LOCATION')
+CLIENT_CACHE_SIZE = int(os.getenv('CLIENT_CACHE_SIZE', '2000'))
+CLIENT_CACHE_TTL = float(os.getenv('CLIENT_CACHE_TTL', '30'))
+
+# Rows per insert() / post_payments_bulk call for bulk imports, and ids per in.() lookup
+BULK_BATCH_SIZE = 500
+LOOKUP_BATCH_SIZE = 200
+
+# Numeric client fields that arrive as strings in CSV imports
+BULK_NUMERIC_FIELDS = ['loanAmount', 'amountPaid', 'interestRate', 'monthlyPayment']
+
+# Columns the payment due notification needs from each client
+DUE_NOTIFICATION_COLUMNS = "id,client_uuid,first_name,last_name,email,phone,loan_amount,amount_paid,status,start_date,due_date"
+
+# Rows per page when streaming the whole book (below PostgREST's default max-rows of 1000)
+STREAM_PAGE_SIZE = 500
+
+# Columns matched by the q= text search
+SEARCH_COLUMNS = ['first_name', 'last_name', 'email', 'phone', 'id_number']
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Encode the (created_at, id) keyset position of a raw client row"""
+    raw = json.dumps([row.get('created_at'), row.get('id')])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor produced by encode_cursor into (created_at, id)"""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return str(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def any_of(query, conditions: str):
+    """Add a PostgREST or=(...) filter (postgrest 0.13 has no or_() builder method)"""
+    query.params = query.params.add('or', f'({conditions})')
+    return query
+
+def order_by(query, *orderings: str):
+    """Sort on several columns in one order= param, e.g. order_by(query, 'created_at.desc', 'id.desc')
+
+    Chained .order() calls add one order= param each, and PostgREST only applies one of them.
+    """
+    query.params = query.params.add('order', ','.join(orderings))
+    return query
+
+@instrument_methods
 class SupabaseService:
     """Database service using Supabase PostgreSQL"""
     
@@ -23,7 +98,37 @@ class SupabaseService:
             raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY environment variables are required")
         
         self.client: Client = create_client(self.supabase_url, self.supabase_key)
-        print(f"✅ Connected to Supabase database")
+        logger.info("✅ Connected to Supabase database")
+        
+        # Count PostgREST round trips per API request (X-DB-Calls, see db_calls.py)
+        try:
+            install_httpx_counter(self.client.postgrest.session)
+        except Exception as e:
+            logger.warning("⚠️ Warning: Could not install DB round-trip counter: %s", e)
+        
+        # Flipped off the first time the get_dashboard_analytics SQL function is missing
+        self._analytics_rpc_available = True
+        
+        # Flipped off the first time the find_existing_client_emails SQL function is missing
+        self._email_lookup_rpc_available = True
+        
+        # Flipped off the first time portfolio_rollup is missing (see create_portfolio_rollup.sql);
+        # the table is kept up to date by triggers on clients
+        self._rollup_available = True
+        
+        # Flipped off the first time table_versions is missing (see create_clients_version.sql)
+        self._clients_version_available = True
+        
+        # Flipped off the first time the post_payment / post_payments_bulk SQL functions are missing
+        self._post_payment_rpc_available = True
+        self._post_payments_bulk_rpc_available = True
+        
+        # client_uuid / numeric id -> clients.id, so hot clients resolve with one primary key lookup
+        self._client_pk_cache: Dict[str, int] = {}
+        
+        # client_uuid / numeric id -> mapped client, refreshed or dropped by every client write
+        self._client_cache = create_client_cache(CLIENT_CACHE_BACKEND, CLIENT_CACHE_SIZE, CLIENT_CACHE_TTL,
+                                                 CLIENT_CACHE_LOCATION)
         
         # Initialize tables if they don't exist
         self._initialize_tables()
@@ -33,9 +138,9 @@ class SupabaseService:
         try:
             # This will be handled by Supabase migrations
             # For now, we'll assume tables exist or create them manually
-            print("📋 Database tables initialized")
+            logger.info("📋 Database tables initialized")
         except Exception as e:
-            print(f"⚠️ Warning: Could not initialize tables: {e}")
+            logger.warning("⚠️ Warning: Could not initialize tables: %s", e)
     
     def is_connected(self) -> bool:
         """Check if database is connected"""
@@ -50,143 +155,177 @@ class SupabaseService:
     def create_client(self, client_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new client"""
         try:
-            # Handle field mapping between frontend and database
-            mapped_data = client_data.copy()
-            
-            # Handle the frontend UUID - store it as client_uuid but don't use it as primary key
-            if 'id' in mapped_data:
-                mapped_data['client_uuid'] = mapped_data['id']
-                del mapped_data['id']  # Remove frontend id, let database auto-generate primary key
-            
-            # Split name into first_name and last_name if needed
-            if 'name' in mapped_data and 'first_name' not in mapped_data:
-                name_parts = mapped_data['name'].split(' ', 1)
-                mapped_data['first_name'] = name_parts[0]
-                mapped_data['last_name'] = name_parts[1] if len(name_parts) > 1 else ''
-                del mapped_data['name']  # Remove the original name field
-            
-            # Handle date fields - convert ISO timestamps to date strings where needed
-            if 'dueDate' in mapped_data and mapped_data['dueDate']:
-                # Convert ISO timestamp to date string (YYYY-MM-DD)
-                try:
-                    if 'T' in str(mapped_data['dueDate']):
-                        dt = datetime.fromisoformat(mapped_data['dueDate'].replace('Z', '+00:00'))
-                        mapped_data['dueDate'] = dt.date().isoformat()
-                except Exception as e:
-                    print(f"⚠️ Warning: Could not parse dueDate {mapped_data['dueDate']}: {e}")
-            
-            if 'startDate' in mapped_data and mapped_data['startDate']:
-                # Ensure startDate is in YYYY-MM-DD format
-                if 'T' in str(mapped_data['startDate']):
-                    try:
-                        dt = datetime.fromisoformat(mapped_data['startDate'].replace('Z', '+00:00'))
-                        mapped_data['startDate'] = dt.date().isoformat()
-                    except Exception as e:
-                        print(f"⚠️ Warning: Could not parse startDate {mapped_data['startDate']}: {e}")
-
-            # Map camelCase to snake_case fields
-            field_mappings = {
-                'loanAmount': 'loan_amount',
-                'loanType': 'loan_type', 
-                'amountPaid': 'amount_paid',
-                'applicationDate': 'application_date',
-                'lastStatusUpdate': 'last_status_update',
-                'idNumber': 'id_number',
-                'interestRate': 'interest_rate',
-                'startDate': 'start_date',
-                'dueDate': 'due_date',
-                'monthlyPayment': 'monthly_payment',
-                'paymentHistory': 'payment_history'
-            }
-            
-            for frontend_field, db_field in field_mappings.items():
-                if frontend_field in mapped_data:
-                    mapped_data[db_field] = mapped_data[frontend_field]
-                    del mapped_data[frontend_field]
+            mapped_data = prepare_client_record(client_data)
             
-            # Add timestamps
-            now = datetime.now(timezone.utc).isoformat()
-            mapped_data['created_at'] = now
-            mapped_data['updated_at'] = now
-            
-            # Debug logging: print the data being inserted
-            print(f"🔍 DEBUG: About to insert client data:")
-            print(f"📝 Mapped data keys: {list(mapped_data.keys())}")
-            print(f"📝 Mapped data: {mapped_data}")
+            logger.debug("🔍 Inserting client: %s", mapped_data)
             
             # Insert into Supabase
-            print(f"🔍 DEBUG: Calling Supabase insert...")
             try:
                 result = self.client.table('clients').insert(mapped_data).execute()
-                print(f"✅ DEBUG: Insert successful, result: {result.data}")
+                logger.debug("✅ Insert successful, result: %s", result.data)
             except Exception as insert_error:
-                print(f"❌ DEBUG: Supabase insert failed!")
-                print(f"❌ Error type: {type(insert_error).__name__}")
-                print(f"❌ Error message: {str(insert_error)}")
-                print(f"❌ Data that failed to insert: {mapped_data}")
-                import traceback
-                print(f"❌ Full traceback: {traceback.format_exc()}")
+                logger.exception("❌ Supabase insert failed (%s): %s", type(insert_error).__name__, insert_error)
+                logger.debug("❌ Data that failed to insert: %s", mapped_data)
                 raise Exception(f"Database insert failed: {str(insert_error)}")
             
             if result.data and len(result.data) > 0:
                 created_client = result.data[0]
                 
                 # Apply field mapping to returned client data
-                mapped_client = {}
-                
-                # Handle ID mapping
-                if 'client_uuid' in created_client and created_client['client_uuid']:
-                    mapped_client['id'] = created_client['client_uuid']
-                else:
-                    mapped_client['id'] = str(created_client['id']) if 'id' in created_client else None
-                
-                # Combine first_name and last_name into name
-                if 'first_name' in created_client and 'last_name' in created_client:
-                    mapped_client['name'] = f"{created_client['first_name']} {created_client['last_name']}".strip()
-                
-                # Map all fields to frontend format (camelCase)
-                field_mappings = {
-                    'email': 'email',
-                    'phone': 'phone', 
-                    'address': 'address',
-                    'loan_amount': 'loanAmount',
-                    'loan_type': 'loanType', 
-                    'amount_paid': 'amountPaid',
-                    'status': 'status',
-                    'application_date': 'applicationDate',
-                    'last_status_update': 'lastStatusUpdate',
-                    'id_number': 'idNumber',
-                    'interest_rate': 'interestRate',
-                    'start_date': 'startDate',
-                    'due_date': 'dueDate',
-                    'monthly_payment': 'monthlyPayment',
-                    'payment_history': 'paymentHistory',
-                    'documents': 'documents',
-                    'notes': 'notes',
-                    'created_at': 'createdAt',
-                    'updated_at': 'updatedAt',
-                    'last_payment_date': 'lastPaymentDate',
-                    'repayment_due_date': 'repaymentDueDate'
-                }
-                
-                for db_field, frontend_field in field_mappings.items():
-                    if db_field in created_client:
-                        mapped_client[frontend_field] = created_client[db_field]
+                mapped_client = map_client_row(created_client)
+                self._remember_client_pk(mapped_client['id'], created_client)
+                self._cache_client_row(created_client)
                 
                 return mapped_client
             
             raise Exception("Failed to create client")
             
         except Exception as e:
-            print(f"❌ Error creating client: {e}")
+            logger.error("❌ Error creating client: %s", e)
             raise
     
+    def _find_existing_client_keys(self, emails: List[str], id_numbers: List[str]) -> Dict[str, set]:
+        """Look up which emails (lowercased) and id numbers already belong to a client"""
+        existing = {'email': set(), 'id_number': set()}
+        lookups = [('id_number', id_numbers)]
+        
+        emails = list(dict.fromkeys(email.lower() for email in emails))
+        if self._email_lookup_rpc_available:
+            try:
+                for start in range(0, len(emails), LOOKUP_BATCH_SIZE):
+                    chunk = emails[start:start + LOOKUP_BATCH_SIZE]
+                    result = self.client.rpc('find_existing_client_emails', {'p_emails': chunk}).execute()
+                    existing['email'].update(str(email) for email in result.data or [])
+            except Exception as rpc_error:
+                # PGRST202: function not installed yet (see create_client_import_function.sql)
+                if 'PGRST202' not in str(rpc_error):
+                    raise
+                self._email_lookup_rpc_available = False
+                existing['email'].clear()
+                logger.warning("⚠️ find_existing_client_emails RPC unavailable, matching emails exactly: %s", rpc_error)
+        
+        if not self._email_lookup_rpc_available:
+            # in.() is case-sensitive, so stored emails only match lowercased
+            lookups.append(('email', emails))
+        
+        for column, values in lookups:
+            # Values with PostgREST filter syntax in them can't be matched with in.()
+            values = [value for value in dict.fromkeys(values) if not any(ch in value for ch in ',()"\\')]
+            for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+                chunk = values[start:start + LOOKUP_BATCH_SIZE]
+                result = self.client.table('clients').select(column).in_(column, chunk).execute()
+                for row in result.data or []:
+                    if row.get(column):
+                        existing[column].add(str(row[column]).lower() if column == 'email' else str(row[column]))
+        
+        return existing
+    
+    def import_clients_bulk(self, clients: List[Dict[str, Any]], batch_size: int = BULK_BATCH_SIZE,
+                            dedupe: bool = True) -> Dict[str, Any]:
+        """Create many clients with batched inserts, skipping duplicate emails/id numbers"""
+        try:
+            results: List[Optional[Dict[str, Any]]] = [None] * len(clients)
+            
+            # 1. Clean and validate every row (CSV rows arrive as strings with blanks)
+            valid_rows = []
+            for index, client in enumerate(clients):
+                client = {
+                    key.strip(): value.strip() if isinstance(value, str) else value
+                    for key, value in client.items()
+                    if key and value not in (None, '')
+                }
+                is_valid, errors = validate_client_data(client)
+                for field in BULK_NUMERIC_FIELDS:
+                    if field not in client:
+                        continue
+                    try:
+                        client[field] = float(client[field])
+                    except (TypeError, ValueError):
+                        # validate_client_data already reports a bad loanAmount
+                        if field != 'loanAmount':
+                            errors.append(f"{field} must be a number")
+                if errors:
+                    results[index] = {'row': index, 'status': 'invalid', 'error': ', '.join(errors)}
+                    continue
+                valid_rows.append((index, client))
+            
+            # 2. Dedupe on email (case-insensitively) / id number, within the file and against the database
+            if dedupe:
+                emails = [client['email'] for _, client in valid_rows]
+                id_numbers = [str(client.get('idNumber') or client.get('id_number') or '') for _, client in valid_rows]
+                existing = self._find_existing_client_keys(
+                    emails,
+                    [id_number for id_number in id_numbers if id_number]
+                )
+            
+                seen_emails: Dict[str, int] = {}
+                seen_id_numbers: Dict[str, int] = {}
+                unique_rows = []
+                for index, client in valid_rows:
+                    email = client['email'].lower()
+                    id_number = str(client.get('idNumber') or client.get('id_number') or '')
+            
+                    if email in existing['email'] or id_number in existing['id_number']:
+                        field = 'email' if email in existing['email'] else 'id_number'
+                        results[index] = {'row': index, 'status': 'duplicate', 'error': f"{field} already exists"}
+                    elif email in seen_emails or id_number in seen_id_numbers:
+                        first = seen_emails.get(email, seen_id_numbers.get(id_number))
+                        results[index] = {'row': index, 'status': 'duplicate', 'error': f"Duplicate of row {first}"}
+                    else:
+                        seen_emails[email] = index
+                        if id_number:
+                            seen_id_numbers[id_number] = index
+                        unique_rows.append((index, client))
+                valid_rows = unique_rows
+            
+            # 3. Map through the same logic as create_client and insert in batches
+            for start in range(0, len(valid_rows), batch_size):
+                batch = valid_rows[start:start + batch_size]
+                try:
+                    self._insert_client_batch(batch, results)
+                except Exception as batch_error:
+                    # One bad row fails the whole insert; retry row by row so only it is reported
+                    logger.warning("⚠️ Client batch %s failed (%s), retrying row by row",
+                                   start // batch_size + 1, batch_error)
+                    for row in batch:
+                        try:
+                            self._insert_client_batch([row], results)
+                        except Exception as row_error:
+                            results[row[0]] = {'row': row[0], 'status': 'failed', 'error': str(row_error)}
+            
+            counts = {'created': 0, 'duplicate': 0, 'invalid': 0, 'failed': 0}
+            for result in results:
+                counts[result['status'] if result else 'failed'] += 1
+            logger.info("📥 Bulk client import: %s created, %s duplicates, %s invalid, %s failed",
+                        counts['created'], counts['duplicate'], counts['invalid'], counts['failed'])
+            
+            return {
+                'total': len(clients),
+                **counts,
+                'results': results
+            }
+        
+        except Exception as e:
+            logger.error("❌ Error importing clients: %s", e)
+            raise
+    
+    def _insert_client_batch(self, batch: List[tuple], results: List[Optional[Dict[str, Any]]]):
+        """Insert (row index, client) pairs in one call and record them as created"""
+        records = [prepare_client_record(client) for _, client in batch]
+        inserted = self.client.table('clients').insert(records).execute().data or []
+        
+        # PostgREST returns inserted rows in request order
+        for (index, _), row in zip(batch, inserted):
+            mapped_id = map_client_row(row)['id']
+            self._remember_client_pk(mapped_id, row)
+            results[index] = {'row': index, 'status': 'created', 'id': mapped_id}
+    
     # Loan Management Methods (Multiple Loans per Client)
     def add_loan_to_client(self, client_id: str, loan_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Add an additional loan to an existing client"""
         try:
-            # Get existing client
-            client = self.get_client_by_id(client_id)
+            # Get existing client; the new total is written back, so it must not be a cached copy
+            client = self.get_client_by_id(client_id, fresh=True)
             if not client:
                 raise Exception(f"Client with ID {client_id} not found")
             
@@ -206,11 +345,11 @@ class SupabaseService:
                 'notes': loan_data.get('notes', f'Additional loan of {loan_amount}')
             }
             
-            print(f"🔍 Adding new loan: {loan_record}")
+            logger.debug("🔍 Adding new loan: %s", loan_record)
             
             # Insert loan record
             loan_result = self.client.table('loans').insert(loan_record).execute()
-            print(f"✅ Loan record created: {loan_result.data}")
+            logger.debug("✅ Loan record created: %s", loan_result.data)
             
             # Update client's total loan amount
             current_loan_amount = client.get('loanAmount', client.get('loan_amount', 0))
@@ -228,16 +367,15 @@ class SupabaseService:
                 'updated_at': datetime.now(timezone.utc).isoformat()
             }
             
-            print(f"🔍 Updating client total loan amount from {current_loan_amount} to {new_total_loan_amount}")
+            logger.debug("🔍 Updating client total loan amount from %s to %s",
+                         current_loan_amount, new_total_loan_amount)
             updated_client = self.update_client(client_id, update_data)
-            print(f"✅ Client updated with new loan: {updated_client}")
+            logger.debug("✅ Client updated with new loan: %s", updated_client)
             
             return updated_client
             
         except Exception as e:
-            print(f"❌ Error adding loan: {e}")
-            import traceback
-            print(f"📍 Add loan error traceback: {traceback.format_exc()}")
+            logger.exception("❌ Error adding loan: %s", e)
             raise
     
     def get_client_loans(self, client_id: str) -> List[Dict[str, Any]]:
@@ -247,7 +385,7 @@ class SupabaseService:
             return result.data or []
             
         except Exception as e:
-            print(f"❌ Error getting client loans: {e}")
+            logger.error("❌ Error getting client loans: %s", e)
             raise
     
     def archive_client(self, client_id: str) -> Optional[Dict[str, Any]]:
@@ -260,12 +398,12 @@ class SupabaseService:
             }
             
             updated_client = self.update_client(client_id, update_data)
-            print(f"📦 Client archived: {client_id}")
+            logger.info("📦 Client archived: %s", client_id)
             
             return updated_client
             
         except Exception as e:
-            print(f"❌ Error archiving client: {e}")
+            logger.error("❌ Error archiving client: %s", e)
             raise
     
     def unarchive_client(self, client_id: str) -> Optional[Dict[str, Any]]:
@@ -278,193 +416,254 @@ class SupabaseService:
             }
             
             updated_client = self.update_client(client_id, update_data)
-            print(f"📤 Client unarchived: {client_id}")
+            logger.info("📤 Client unarchived: %s", client_id)
             
             return updated_client
             
         except Exception as e:
-            print(f"❌ Error unarchiving client: {e}")
+            logger.error("❌ Error unarchiving client: %s", e)
             raise
     
     def get_all_clients(self, include_archived: bool = False) -> List[Dict[str, Any]]:
         """Get all clients (optionally include archived)"""
+        # Paged so books larger than PostgREST's max-rows aren't silently cut off
+        return [client for page in self.iter_client_pages(include_archived=include_archived) for client in page]
+    
+    def iter_client_pages(self, page_size: int = STREAM_PAGE_SIZE, **filters) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of mapped clients (same filters as list_clients), fetching the next page only when asked"""
+        cursor = None
+        while True:
+            page = self.list_clients(limit=page_size, cursor=cursor, **filters)
+            if page['clients']:
+                yield page['clients']
+            
+            cursor = page['nextCursor']
+            if not cursor:
+                return
+    
+    def list_clients(self, include_archived: bool = False, limit: Optional[int] = None,
+                     cursor: Optional[str] = None, status: Optional[List[str]] = None,
+                     loan_type: Optional[List[str]] = None, due_from: Optional[str] = None,
+                     due_to: Optional[str] = None, search: Optional[str] = None,
+                     fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get a filtered page of clients, newest first, keyset-paginated on (created_at, id)"""
         try:
-            if include_archived:
-                result = self.client.table('clients').select("*").order('created_at', desc=True).execute()
+            # Only fetch the columns the requested fields need, plus the keyset columns
+            if fields:
+                columns = {'id', 'created_at'}
+                for field in fields:
+                    columns.update(CLIENT_FIELD_COLUMNS.get(field, []))
+                query = self.client.table('clients').select(",".join(sorted(columns)))
             else:
+                query = self.client.table('clients').select("*")
+            
+            if not include_archived:
                 # Only get non-archived clients for main CRM view
-                result = self.client.table('clients').select("*").eq('archived', False).order('created_at', desc=True).execute()
+                query = query.eq('archived', False)
+            
+            if status:
+                query = query.in_('status', status)
+            if loan_type:
+                query = query.in_('loan_type', loan_type)
+            if due_from:
+                query = query.gte('due_date', due_from)
+            if due_to:
+                query = query.lte('due_date', due_to)
+            
+            if search:
+                # Strip characters that have meaning inside a PostgREST or=() filter
+                term = ''.join(ch for ch in search if ch not in ',()*"\\').strip()
+                if term:
+                    query = any_of(query, ",".join(f"{column}.ilike.*{term}*" for column in SEARCH_COLUMNS))
+            
+            if cursor:
+                created_at, row_id = decode_cursor(cursor)
+                query = any_of(query, f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})')
+            
+            query = order_by(query, 'created_at.desc', 'id.desc')
+            
+            # Fetch one extra row to know whether another page exists
+            if limit:
+                query = query.limit(limit + 1)
+            
+            result = query.execute()
             
             clients = result.data or []
             
+            next_cursor = None
+            if limit and len(clients) > limit:
+                clients = clients[:limit]
+                next_cursor = encode_cursor(clients[-1])
+            
             # Map fields back to frontend format
-            mapped_clients = []
-            for client in clients:
-                # Create a clean mapped client object
-                mapped_client = {}
-                
-                # Handle ID mapping
-                if 'client_uuid' in client and client['client_uuid']:
-                    mapped_client['id'] = client['client_uuid']
-                else:
-                    mapped_client['id'] = str(client['id']) if 'id' in client else None
-                
-                # Combine first_name and last_name into name
-                if 'first_name' in client and 'last_name' in client:
-                    mapped_client['name'] = f"{client['first_name']} {client['last_name']}".strip()
-                
-                # Map all fields to frontend format (camelCase)
-                field_mappings = {
-                    'email': 'email',
-                    'phone': 'phone', 
-                    'address': 'address',
-                    'loan_amount': 'loanAmount',
-                    'loan_type': 'loanType', 
-                    'amount_paid': 'amountPaid',
-                    'status': 'status',
-                    'application_date': 'applicationDate',
-                    'last_status_update': 'lastStatusUpdate',
-                    'id_number': 'idNumber',
-                    'interest_rate': 'interestRate',
-                    'start_date': 'startDate',
-                    'due_date': 'dueDate',
-                    'monthly_payment': 'monthlyPayment',
-                    'payment_history': 'paymentHistory',
-                    'documents': 'documents',
-                    'notes': 'notes',
-                    'created_at': 'createdAt',
-                    'updated_at': 'updatedAt',
-                    'last_payment_date': 'lastPaymentDate',
-                    'repayment_due_date': 'repaymentDueDate'
-                }
-                
-                for db_field, frontend_field in field_mappings.items():
-                    if db_field in client:
-                        mapped_client[frontend_field] = client[db_field]
-                
-                mapped_clients.append(mapped_client)
+            mapped_clients = map_client_rows(clients)
+            
+            if fields:
+                mapped_clients = [
+                    {field: client[field] for field in fields if field in client}
+                    for client in mapped_clients
+                ]
             
-            return mapped_clients
+            return {'clients': mapped_clients, 'nextCursor': next_cursor}
             
         except Exception as e:
-            print(f"❌ Error getting clients: {e}")
+            logger.error("❌ Error getting clients: %s", e)
             raise
     
-    def get_client_by_id(self, client_id: str) -> Optional[Dict[str, Any]]:
-        """Get a client by ID"""
+    def get_clients_due_on(self, due_date: str, include_undated: bool = False) -> List[Dict[str, Any]]:
+        """Get non-archived clients whose due_date is due_date (and, optionally, those with none)"""
         try:
-            client = None
+            # Indexed equality lookup on clients.due_date
+            query = self.client.table('clients').select(DUE_NOTIFICATION_COLUMNS).eq('archived', False)
+            clients = query.eq('due_date', due_date).execute().data or []
             
-            # Try UUID first (client_uuid field)
-            result = self.client.table('clients').select("*").eq('client_uuid', client_id).execute()
-            if result.data and len(result.data) > 0:
-                client = result.data[0]
+            if include_undated:
+                # Older clients without a custom due date (month-end fallback)
+                query = self.client.table('clients').select(DUE_NOTIFICATION_COLUMNS).eq('archived', False)
+                clients.extend(query.is_('due_date', 'null').execute().data or [])
             
-            # Try numeric ID 
-            if not client:
+            return map_client_rows(clients)
+        
+        except Exception as e:
+            logger.error("❌ Error getting clients due on %s: %s", due_date, e)
+            raise
+    
+    def get_clients_version(self) -> str:
+        """Cheap version of the clients table, moved by every write to it"""
+        try:
+            if self._clients_version_available:
+                # Bumped by a statement trigger on clients, so this is a primary key lookup
                 try:
-                    result = self.client.table('clients').select("*").eq('id', int(client_id)).execute()
-                    if result.data and len(result.data) > 0:
-                        client = result.data[0]
-                except ValueError:
-                    pass
+                    result = self.client.table('table_versions').select('version') \
+                        .eq('table_name', 'clients').limit(1).execute()
+                    if result.data:
+                        return f"v{result.data[0]['version']}"
+                except Exception as version_error:
+                    if any(code in str(version_error) for code in MISSING_TABLE_CODES):
+                        self._clients_version_available = False
+                    logger.warning("⚠️ Clients version counter unavailable, using count and updated_at: %s", version_error)
+            
+            # Fallback: row count plus the latest updated_at. count='exact' counts the whole table
+            # on every call, which is why the counter above exists. NULLs sort first under desc,
+            # so rows without updated_at (none are written today) are filtered out.
+            result = self.client.table('clients').select('updated_at', count='exact') \
+                .not_.is_('updated_at', 'null').order('updated_at', desc=True).limit(1).execute()
+            latest = result.data[0]['updated_at'] if result.data else None
+            return f"{result.count or 0}:{latest}"
+        
+        except Exception as e:
+            logger.error("❌ Error getting clients version: %s", e)
+            raise
+    
+    def get_client_by_id(self, client_id: str, fresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Get a client by ID
+        
+        fresh=True skips the cache (which can be a TTL behind other workers' writes) for
+        read-modify-write callers, and refreshes it with the row read.
+        """
+        try:
+            cached = None if fresh else self._client_cache.get(client_id)
+            if cached is not None:
+                return cached
+            
+            client = self._select_client_row(client_id)
             
             if client:
                 # Apply field mapping to single client
-                mapped_client = {}
-                
-                # Handle ID mapping
-                if 'client_uuid' in client and client['client_uuid']:
-                    mapped_client['id'] = client['client_uuid']
-                else:
-                    mapped_client['id'] = str(client['id']) if 'id' in client else None
-                
-                # Combine first_name and last_name into name
-                if 'first_name' in client and 'last_name' in client:
-                    mapped_client['name'] = f"{client['first_name']} {client['last_name']}".strip()
-                
-                # Map all fields to frontend format (camelCase)
-                field_mappings = {
-                    'email': 'email',
-                    'phone': 'phone', 
-                    'address': 'address',
-                    'loan_amount': 'loanAmount',
-                    'loan_type': 'loanType', 
-                    'amount_paid': 'amountPaid',
-                    'status': 'status',
-                    'application_date': 'applicationDate',
-                    'last_status_update': 'lastStatusUpdate',
-                    'id_number': 'idNumber',
-                    'interest_rate': 'interestRate',
-                    'start_date': 'startDate',
-                    'due_date': 'dueDate',
-                    'monthly_payment': 'monthlyPayment',
-                    'payment_history': 'paymentHistory',
-                    'documents': 'documents',
-                    'notes': 'notes',
-                    'created_at': 'createdAt',
-                    'updated_at': 'updatedAt',
-                    'last_payment_date': 'lastPaymentDate',
-                    'repayment_due_date': 'repaymentDueDate'
-                }
-                
-                for db_field, frontend_field in field_mappings.items():
-                    if db_field in client:
-                        mapped_client[frontend_field] = client[db_field]
-                
-                return mapped_client
+                return self._cache_client_row(client)
             
             return None
             
         except Exception as e:
-            print(f"❌ Error getting client: {e}")
+            logger.error("❌ Error getting client: %s", e)
             raise
     
+    def _match_client(self, query, client_id: str):
+        """Restrict a clients query to one client by client_uuid or numeric id in a single request"""
+        client_id = str(client_id)
+        
+        primary_key = self._client_pk_cache.get(client_id)
+        if primary_key is not None:
+            return query.eq('id', primary_key)
+        
+        if client_id.isdigit():
+            # Frontend UUIDs are never all digits, so this can only match one row
+            return any_of(query, f'client_uuid.eq."{client_id}",id.eq.{int(client_id)}')
+        
+        return query.eq('client_uuid', client_id)
+    
+    def _remember_client_pk(self, client_id: str, row: Optional[Dict[str, Any]]):
+        """Cache the primary key a client id resolved to"""
+        if not row or row.get('id') is None:
+            return
+        
+        if len(self._client_pk_cache) >= CLIENT_PK_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            self._client_pk_cache.pop(next(iter(self._client_pk_cache)))
+        self._client_pk_cache[str(client_id)] = row['id']
+    
+    def _cache_client_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a freshly read or written clients row and cache it if it is a full row"""
+        mapped_client = map_client_row(row)
+        keys = ClientCache.keys_for(row)
+        if 'client_uuid' in row and CLIENT_FIELD_MAPPINGS.keys() <= row.keys():
+            self._client_cache.put(keys, mapped_client)
+        else:
+            # A projected row can't stand in for the client, but it does mean the cached one is stale
+            self._client_cache.invalidate(*keys)
+        return mapped_client
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters of the client cache"""
+        return self._client_cache.stats()
+    
+    def _select_client_row(self, client_id: str, columns: str = "*") -> Optional[Dict[str, Any]]:
+        """Fetch a raw client row by client_uuid or numeric id"""
+        if columns != "*" and 'id' not in columns.split(','):
+            columns = f"id,{columns}"
+        
+        result = self._match_client(self.client.table('clients').select(columns), client_id).execute()
+        if not result.data:
+            return None
+        
+        row = result.data[0]
+        self._remember_client_pk(client_id, row)
+        return row
+    
     def update_client(self, client_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a client"""
         try:
             # Add updated timestamp
             update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
             
-            # Try UUID first (client_uuid field)
-            result = self.client.table('clients').update(update_data).eq('client_uuid', client_id).execute()
-            if result.data and len(result.data) > 0:
-                return result.data[0]
+            result = self._match_client(self.client.table('clients').update(update_data), client_id).execute()
+            if not result.data:
+                self._client_cache.invalidate(client_id)
+                return None
             
-            # Try numeric ID
-            try:
-                result = self.client.table('clients').update(update_data).eq('id', int(client_id)).execute()
-                if result.data and len(result.data) > 0:
-                    return result.data[0]
-            except ValueError:
-                pass
+            updated = result.data[0]
+            self._remember_client_pk(client_id, updated)
+            self._cache_client_row(updated)
             
-            return None
+            return updated
             
         except Exception as e:
-            print(f"❌ Error updating client: {e}")
+            # The write may or may not have landed
+            self._client_cache.invalidate(client_id)
+            logger.error("❌ Error updating client: %s", e)
             raise
     
     def delete_client(self, client_id: str) -> bool:
         """Delete a client"""
         try:
-            # Try UUID first (client_uuid field)
-            result = self.client.table('clients').delete().eq('client_uuid', client_id).execute()
-            if result.data and len(result.data) > 0:
-                return True
-            
-            # Try numeric ID
-            try:
-                result = self.client.table('clients').delete().eq('id', int(client_id)).execute()
-                if result.data and len(result.data) > 0:
-                    return True
-            except ValueError:
-                pass
+            result = self._match_client(self.client.table('clients').delete(), client_id).execute()
+            self._client_pk_cache.pop(str(client_id), None)
+            self._client_cache.invalidate(client_id, *(key for row in result.data or [] for key in ClientCache.keys_for(row)))
             
-            return False
+            return bool(result.data)
             
         except Exception as e:
-            print(f"❌ Error deleting client: {e}")
+            logger.error("❌ Error deleting client: %s", e)
             raise
     
     def update_client_status(self, client_id: str, new_status: str) -> Optional[Dict[str, Any]]:
@@ -478,15 +677,97 @@ class SupabaseService:
             return self.update_client(client_id, update_data)
             
         except Exception as e:
-            print(f"❌ Error updating client status: {e}")
+            logger.error("❌ Error updating client status: %s", e)
+            raise
+    
+    def sweep_client_statuses(self, today: Optional[date] = None) -> Dict[str, int]:
+        """Move clients to overdue / repayment-due by due_date, one set-based UPDATE per transition"""
+        try:
+            today = today or datetime.now(timezone.utc).date()
+            due_by = today + timedelta(days=REPAYMENT_DUE_WINDOW_DAYS)
+            now = datetime.now(timezone.utc).isoformat()
+            
+            counts = {}
+            for from_status, to_status in STATUS_SWEEP_TRANSITIONS:
+                query = self.client.table('clients').update({
+                    'status': to_status,
+                    'last_status_update': now,
+                    'updated_at': now
+                }).eq('status', from_status).eq('archived', False)
+                
+                if to_status == 'overdue':
+                    # Due date has fully passed
+                    query = query.lt('due_date', today.isoformat())
+                else:
+                    # Due today or within the repayment window
+                    query = query.gte('due_date', today.isoformat()).lte('due_date', due_by.isoformat())
+                
+                rows = query.execute().data or []
+                counts[f"{from_status}->{to_status}"] = len(rows)
+                for row in rows:
+                    self._cache_client_row(row)
+            
+            logger.info("🔄 Status sweep for %s: %s", today,
+                        ", ".join(f"{transition}: {count}" for transition, count in counts.items()))
+            return counts
+        
+        except Exception as e:
+            logger.error("❌ Error sweeping client statuses: %s", e)
             raise
     
     # Payment operations
     def add_payment(self, client_id: str, payment_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Add a payment for a client with compound interest logic"""
+        """Add a payment for a client in one atomic post_payment call"""
+        return self._post_payment(client_id, payment_data)['client']
+    
+    def _post_payment(self, client_id: str, payment_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Post one payment, returning {'client': <updated row>, 'payment': <payment row as inserted>}"""
+        if not self._post_payment_rpc_available:
+            return self._add_payment_in_steps(client_id, payment_data)
+        
+        try:
+            payment_amount = payment_data.get('amount', 0)
+            if payment_amount <= 0:
+                raise Exception("Payment amount must be greater than 0")
+            
+            try:
+                result = self.client.rpc('post_payment', {
+                    'p_client_id': str(client_id),
+                    'p_amount': payment_amount,
+                    'p_payment_date': payment_data.get('payment_date', datetime.now(timezone.utc).date().isoformat()),
+                    'p_notes': payment_data.get('notes')
+                }).execute()
+            except Exception as rpc_error:
+                # PGRST202: function not installed yet (see create_post_payment_function.sql)
+                if 'PGRST202' not in str(rpc_error):
+                    raise
+                self._post_payment_rpc_available = False
+                logger.warning("⚠️ post_payment RPC unavailable, posting payment in steps: %s", rpc_error)
+                return self._add_payment_in_steps(client_id, payment_data)
+            
+            posted = result.data
+            if not posted:
+                raise Exception(f"Client with ID {client_id} not found")
+            
+            updated_client = posted['client']
+            self._remember_client_pk(client_id, updated_client)
+            self._cache_client_row(updated_client)
+            
+            if updated_client.get('status') == 'paid':
+                logger.info("🎉 Client fully paid! Moving to paid status and archiving")
+            
+            return posted
+            
+        except Exception as e:
+            self._client_cache.invalidate(client_id)
+            logger.error("❌ Error adding payment: %s", e)
+            raise
+    
+    def _add_payment_in_steps(self, client_id: str, payment_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a payment with separate read, insert and update calls (no post_payment function)"""
         try:
-            # Get client first to ensure it exists and get current data
-            client = self.get_client_by_id(client_id)
+            # Get client first to ensure it exists and get current data (uncached: amount_paid is written back)
+            client = self.get_client_by_id(client_id, fresh=True)
             if not client:
                 raise Exception(f"Client with ID {client_id} not found")
             
@@ -510,10 +791,12 @@ class SupabaseService:
             
             # Check if payment would result in overpayment
             remaining_balance = current_amount_due - current_amount_paid
+            if remaining_balance <= 0:
+                raise Exception("Client has no outstanding balance")
             if payment_amount > remaining_balance:
                 # Adjust payment to not exceed remaining balance
                 payment_amount = remaining_balance
-                print(f"⚠️ Payment amount adjusted to prevent overpayment: {payment_amount}")
+                logger.warning("⚠️ Payment amount adjusted to prevent overpayment: %s", payment_amount)
             
             # Prepare payment data for database
             payment_record = {
@@ -524,11 +807,11 @@ class SupabaseService:
                 'notes': payment_data.get('notes', f'Payment of {payment_amount}')
             }
             
-            print(f"🔍 Inserting payment record: {payment_record}")
+            logger.debug("🔍 Inserting payment record: %s", payment_record)
             
             # Insert payment
             payment_result = self.client.table('payments').insert(payment_record).execute()
-            print(f"✅ Payment record created: {payment_result.data}")
+            logger.debug("✅ Payment record created: %s", payment_result.data)
             
             # Update client's amount paid
             new_amount_paid = current_amount_paid + payment_amount
@@ -544,32 +827,122 @@ class SupabaseService:
                 # Update the effective loan amount to reflect this
                 new_principal = current_amount_due / 1.5
                 update_data['loan_amount'] = new_principal
-                print(f"🔄 Compound interest applied - new principal: {new_principal}")
+                logger.info("🔄 Compound interest applied - new principal: %s", new_principal)
             
             # Auto-update status based on payment
-            remaining_after_payment = current_amount_due - new_amount_paid
-            if remaining_after_payment <= 0:
-                update_data['status'] = 'paid'
+            update_data['status'] = status_after_payment(current_amount_due, new_amount_paid)
+            if update_data['status'] == 'paid':
                 # Auto-archive fully paid clients
                 update_data['archived'] = True
-                print(f"🎉 Client fully paid! Moving to paid status and archiving")
-            elif remaining_after_payment < current_amount_due * 0.3:
-                update_data['status'] = 'active'
-            else:
-                update_data['status'] = 'repayment-due'
+                logger.info("🎉 Client fully paid! Moving to paid status and archiving")
             
-            print(f"🔍 Updating client with: {update_data}")
+            logger.debug("🔍 Updating client with: %s", update_data)
             updated_client = self.update_client(client_id, update_data)
-            print(f"✅ Client updated: {updated_client}")
+            logger.debug("✅ Client updated: %s", updated_client)
             
-            return updated_client
+            return {'client': updated_client, 'payment': (payment_result.data or [payment_record])[0]}
             
         except Exception as e:
-            print(f"❌ Error adding payment: {e}")
-            import traceback
-            print(f"📍 Payment error traceback: {traceback.format_exc()}")
+            logger.exception("❌ Error adding payment: %s", e)
             raise
     
+    def add_payments_bulk(self, payments: List[Dict[str, Any]], batch_size: int = BULK_BATCH_SIZE) -> Dict[str, Any]:
+        """Post many payments through post_payments_bulk, one call per batch"""
+        # Every payment is posted by post_payment in the database: capped at the remaining balance,
+        # incremented under the client row lock and failing (and reported) on its own.
+        try:
+            results: List[Optional[Dict[str, Any]]] = [None] * len(payments)
+            today = datetime.now(timezone.utc).date().isoformat()
+            
+            # 1. Validate every row up front
+            valid_rows = []
+            for index, payment in enumerate(payments):
+                client_id = str(payment.get('clientId') or payment.get('client_id') or '').strip()
+                is_valid, errors = validate_payment_data({**payment, 'clientId': client_id})
+                if not is_valid:
+                    results[index] = {'row': index, 'clientId': client_id, 'success': False, 'errors': errors}
+                    continue
+                valid_rows.append({
+                    'row': index,
+                    'client_id': client_id,
+                    'amount': float(payment['amount']),
+                    'payment_date': payment.get('payment_date') or payment.get('paymentDate') or today,
+                    'notes': payment.get('notes')
+                })
+            
+            # 2. Post in batches; a failed call only fails its own rows
+            updated_clients = set()
+            for start in range(0, len(valid_rows), batch_size):
+                batch = valid_rows[start:start + batch_size]
+                try:
+                    posted = self._post_payment_batch(batch)
+                except Exception as batch_error:
+                    logger.error("❌ Payment batch %s failed: %s", start // batch_size + 1, batch_error)
+                    for row in batch:
+                        # The call may have committed before the error reached us
+                        self._client_cache.invalidate(row['client_id'])
+                        results[row['row']] = {'row': row['row'], 'clientId': row['client_id'], 'success': False,
+                                               'errors': [f"Posting failed: {batch_error}"]}
+                    continue
+                
+                client_ids = {row['row']: row['client_id'] for row in batch}
+                for entry in posted:
+                    index = entry['row']
+                    client_id = client_ids[index]
+                    if entry.get('error'):
+                        results[index] = {'row': index, 'clientId': client_id, 'success': False,
+                                          'errors': [entry['error']]}
+                        continue
+                    
+                    # Entries come back in per-client posting order, so the last row seen is the newest
+                    self._remember_client_pk(client_id, entry['client'])
+                    self._cache_client_row(entry['client'])
+                    updated_clients.add(entry['client'].get('id'))
+                    results[index] = {'row': index, 'clientId': client_id, 'success': True,
+                                      'amount': entry['payment']['amount']}
+            
+            posted = sum(1 for result in results if result and result['success'])
+            logger.info("💰 Bulk payments: %s posted, %s failed, %s clients updated",
+                        posted, len(payments) - posted, len(updated_clients))
+            
+            return {
+                'total': len(payments),
+                'posted': posted,
+                'failed': len(payments) - posted,
+                'clientsUpdated': len(updated_clients),
+                'results': results
+            }
+            
+        except Exception as e:
+            logger.error("❌ Error posting bulk payments: %s", e)
+            raise
+    
+    def _post_payment_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Post a batch of payments, returning {'row', 'client', 'payment'} or {'row', 'error'} per payment"""
+        if self._post_payments_bulk_rpc_available:
+            try:
+                return self.client.rpc('post_payments_bulk', {'p_payments': batch}).execute().data or []
+            except Exception as rpc_error:
+                # PGRST202: function not installed yet (see create_post_payment_function.sql)
+                if 'PGRST202' not in str(rpc_error):
+                    raise
+                self._post_payments_bulk_rpc_available = False
+                logger.warning("⚠️ post_payments_bulk RPC unavailable, posting payments one by one: %s", rpc_error)
+        
+        posted = []
+        for row in batch:
+            try:
+                payment_data = {'amount': row['amount'], 'payment_date': row['payment_date']}
+                # Without notes each payment gets the default "Payment of X"
+                if row.get('notes'):
+                    payment_data['notes'] = row['notes']
+                
+                # The amount applied (capped at the balance) is the payment as written, not a separate read
+                posted.append({'row': row['row'], **self._post_payment(row['client_id'], payment_data)})
+            except Exception as e:
+                posted.append({'row': row['row'], 'error': str(e)})
+        return posted
+    
     def _calculate_compound_interest_amount_due(self, loan_amount: float, amount_paid: float, start_date: str, last_payment_date: str = None) -> float:
         """Calculate current amount due with compound interest logic"""
         if not start_date:
@@ -630,7 +1003,7 @@ class SupabaseService:
             return result.data or []
             
         except Exception as e:
-            print(f"❌ Error getting payments: {e}")
+            logger.error("❌ Error getting payments: %s", e)
             raise
     
     # Note operations
@@ -649,118 +1022,77 @@ class SupabaseService:
             raise Exception("Failed to create note")
             
         except Exception as e:
-            print(f"❌ Error adding note: {e}")
+            logger.error("❌ Error adding note: %s", e)
             raise
     
     # Analytics operations
-    def get_analytics_data(self) -> Dict[str, Any]:
-        """Get analytics data for dashboard"""
+    def rebuild_portfolio_rollup(self) -> Dict[str, Any]:
+        """Recompute the portfolio_rollup table from the clients table"""
         try:
-            # Get all clients for calculation
-            clients = self.get_all_clients()
-            
-            if not clients:
-                return {
-                    'totalClients': 0,
-                    'totalLoanAmount': 0,
-                    'totalAmountPaid': 0,
-                    'totalAmountDue': 0,
-                    'totalOutstanding': 0,
-                    'activeLoans': 0,
-                    'overdueCount': 0,
-                    'paidCount': 0,
-                    'repaymentRate': 0,
-                    'avgLoanAmount': 0
-                }
-            
-            # Calculate metrics
-            total_clients = len(clients)
-            total_loan_amount = sum(c.get('loan_amount', 0) for c in clients)
-            total_amount_paid = sum(c.get('amount_paid', 0) for c in clients)
-            total_due = total_loan_amount * 1.5
-            total_outstanding = max(0, total_due - total_amount_paid)
-            
-            active_statuses = ['active', 'repayment-due', 'overdue']
-            active_loans = len([c for c in clients if c.get('status') in active_statuses])
-            overdue_count = len([c for c in clients if c.get('status') == 'overdue'])
-            paid_count = len([c for c in clients if c.get('status') == 'paid'])
-            
-            repayment_rate = (total_amount_paid / total_due * 100) if total_due > 0 else 0
-            avg_loan_amount = total_loan_amount / total_clients if total_clients > 0 else 0
-            
-            return {
-                'totalClients': total_clients,
-                'totalLoanAmount': total_loan_amount,
-                'totalAmountPaid': total_amount_paid,
-                'totalAmountDue': total_due,
-                'totalOutstanding': total_outstanding,
-                'activeLoans': active_loans,
-                'overdueCount': overdue_count,
-                'paidCount': paid_count,
-                'repaymentRate': repayment_rate,
-                'avgLoanAmount': avg_loan_amount
-            }
+            self.client.rpc('rebuild_portfolio_rollup').execute()
+            self._rollup_available = True
+            logger.info("📊 Portfolio rollup rebuilt")
+            return self.get_dashboard_analytics()
             
         except Exception as e:
-            print(f"❌ Error getting analytics: {e}")
+            logger.error("❌ Error rebuilding portfolio rollup: %s", e)
             raise
     
-    def get_status_breakdown(self) -> List[Dict[str, Any]]:
-        """Get client count by status"""
+    def get_dashboard_analytics(self) -> Dict[str, Any]:
+        """Get summary, status breakdown and loan type breakdown in one round trip"""
         try:
-            clients = self.get_all_clients()
-            status_counts = {}
-            
-            for client in clients:
-                status = client.get('status', 'unknown')
-                status_counts[status] = status_counts.get(status, 0) + 1
-            
-            return [{"status": status, "count": count} for status, count in status_counts.items()]
+            if self._rollup_available:
+                try:
+                    result = self.client.table('portfolio_rollup').select("*").execute()
+                    rows = result.data or []
+                    # An unseeded table has no total row; fall through until it is rebuilt
+                    if any(row.get('dimension') == 'total' for row in rows):
+                        return format_analytics(rollup_from_table(rows))
+                except Exception as rollup_error:
+                    # Only a missing table turns the rollup off; a transient error just skips it this time
+                    if any(code in str(rollup_error) for code in MISSING_TABLE_CODES):
+                        self._rollup_available = False
+                    logger.warning("⚠️ Portfolio rollup unavailable, computing analytics live: %s", rollup_error)
+            
+            if self._analytics_rpc_available:
+                try:
+                    result = self.client.rpc('get_dashboard_analytics').execute()
+                    if result.data:
+                        aggregates = result.data
+                        rollup = rollup_from_aggregates(
+                            aggregates.get('totals'),
+                            aggregates.get('statuses'),
+                            aggregates.get('loanTypes')
+                        )
+                        return format_analytics(rollup)
+                except Exception as rpc_error:
+                    # PGRST202: function not installed yet (see create_analytics_function.sql);
+                    # any other error only falls back to the scan for this call
+                    if 'PGRST202' in str(rpc_error):
+                        self._analytics_rpc_available = False
+                    logger.warning("⚠️ Analytics RPC unavailable, using single-pass scan: %s", rpc_error)
+            
+            # Fallback: one pass over the projected rows, paged like get_all_clients so books larger
+            # than PostgREST's max-rows aren't silently cut off
+            rows = (to_db_fields(client) for page in self.iter_client_pages(fields=ANALYTICS_FIELDS)
+                    for client in page)
+            return format_analytics(compute_rollup(rows))
             
         except Exception as e:
-            print(f"❌ Error getting status breakdown: {e}")
+            logger.error("❌ Error getting dashboard analytics: %s", e)
             raise
     
+    def get_analytics_data(self) -> Dict[str, Any]:
+        """Get analytics data for dashboard"""
+        return self.get_dashboard_analytics()['summary']
+    
+    def get_status_breakdown(self) -> List[Dict[str, Any]]:
+        """Get client count by status"""
+        return self.get_dashboard_analytics()['statusBreakdown']
+    
     def get_loan_type_breakdown(self) -> List[Dict[str, Any]]:
         """Get loan amount by loan type"""
-        try:
-            clients = self.get_all_clients()
-            type_data = {}
-            
-            for client in clients:
-                loan_type = client.get('loan_type', 'unknown')
-                loan_amount = client.get('loan_amount', 0)
-                amount_paid = client.get('amount_paid', 0)
-                
-                if loan_type not in type_data:
-                    type_data[loan_type] = {
-                        'count': 0,
-                        'totalAmount': 0,
-                        'totalPaid': 0
-                    }
-                
-                type_data[loan_type]['count'] += 1
-                type_data[loan_type]['totalAmount'] += loan_amount
-                type_data[loan_type]['totalPaid'] += amount_paid
-            
-            result = []
-            for loan_type, data in type_data.items():
-                total_due = data['totalAmount'] * 1.5
-                outstanding = max(0, total_due - data['totalPaid'])
-                
-                result.append({
-                    "type": loan_type,
-                    "count": data['count'],
-                    "amount": data['totalAmount'],
-                    "totalDue": total_due,
-                    "outstanding": outstanding
-                })
-            
-            return result
-            
-        except Exception as e:
-            print(f"❌ Error getting loan type breakdown: {e}")
-            raise
+        return self.get_dashboard_analytics()['loanTypeBreakdown']
 
     # User Management Methods
     def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -775,7 +1107,7 @@ class SupabaseService:
             return None
             
         except Exception as e:
-            print(f"❌ Error creating user: {e}")
+            logger.error("❌ Error creating user: %s", e)
             raise
     
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
@@ -787,7 +1119,7 @@ class SupabaseService:
             return None
             
         except Exception as e:
-            print(f"❌ Error getting user by ID: {e}")
+            logger.error("❌ Error getting user by ID: %s", e)
             raise
     
     def get_user_by_supabase_id(self, supabase_id: str) -> Optional[Dict[str, Any]]:
@@ -799,7 +1131,7 @@ class SupabaseService:
             return None
             
         except Exception as e:
-            print(f"❌ Error getting user by Supabase ID: {e}")
+            logger.error("❌ Error getting user by Supabase ID: %s", e)
             raise
     
     def update_user(self, user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -814,7 +1146,7 @@ class SupabaseService:
             return None
             
         except Exception as e:
-            print(f"❌ Error updating user: {e}")
+            logger.error("❌ Error updating user: %s", e)
             raise
     
     def get_all_users(self) -> List[Dict[str, Any]]:
@@ -824,7 +1156,7 @@ class SupabaseService:
             return result.data or []
             
         except Exception as e:
-            print(f"❌ Error getting all users: {e}")
+            logger.error("❌ Error getting all users: %s", e)
             raise
 
 # Global database service instance
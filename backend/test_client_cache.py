@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Round trips through each client cache backend
+Redis is replaced by a small in-process stand-in, so no server is needed.
+Usage: python -m pytest test_client_cache.py
+"""
+
+import os
+import sys
+import types
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from client_cache import create_client_cache
+
+CLIENT = {'id': 'client-1', 'name': 'Thandi Mokoena', 'loanAmount': 1000, 'paymentHistory': [{'amount': 100}]}
+KEYS = ('client-1', '1')
+
+class FakeRedis:
+    """The handful of redis.Redis calls RedisClientCache makes, kept in a dict (expiry ignored)
+
+    Like Redis, keys may be str or bytes and values come back as bytes.
+    """
+
+    def __init__(self):
+        self.store = {}
+
+    @staticmethod
+    def _key(key):
+        return key.decode() if isinstance(key, bytes) else key
+
+    def get(self, key):
+        return self.store.get(self._key(key))
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, px=None):
+        self.store[self._key(key)] = value.encode() if isinstance(value, str) else value
+
+    def incr(self, key):
+        value = int(self.store.get(self._key(key), 0)) + 1
+        self.store[self._key(key)] = str(value).encode()
+        return value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(self._key(key), None)
+
+    def scan_iter(self, pattern):
+        return [key for key in list(self.store) if key.startswith(pattern.rstrip('*'))]
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    server = FakeRedis()
+    module = types.ModuleType('redis')
+    module.RedisError = type('RedisError', (Exception,), {})
+    module.Redis = types.SimpleNamespace(from_url=lambda url, **kwargs: server)
+    monkeypatch.setitem(sys.modules, 'redis', module)
+    return server
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def cache(request, tmp_path):
+    if request.param == 'redis':
+        request.getfixturevalue('fake_redis')
+    return create_client_cache(request.param, 10, 60, str(tmp_path / 'cache.sqlite3'))
+
+def test_put_get_round_trip(cache):
+    cache.put(KEYS, CLIENT)
+    # Reachable by both keys, as the client itself
+    assert cache.get('client-1') == CLIENT
+    assert cache.get('1') == CLIENT
+    assert cache.get('client-2') is None
+
+def test_put_replaces_entry(cache):
+    cache.put(KEYS, CLIENT)
+    cache.put(KEYS, {**CLIENT, 'loanAmount': 2000})
+    assert cache.get('1')['loanAmount'] == 2000
+
+def test_invalidate_drops_every_key(cache):
+    cache.put(KEYS, CLIENT)
+    cache.invalidate('client-1')
+    assert cache.get('client-1') is None
+    assert cache.get('1') is None
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Round-trip budgets for the hot API endpoints
+Runs the Flask app against a canned PostgREST (httpx.MockTransport), so no database or
+server is needed, and fails when an endpoint makes more Supabase calls than its budget.
+Usage: python -m pytest test_db_call_budgets.py
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Before app is imported (and over any .env): a dummy project, and no client cache so every
+# read reaches PostgREST
+os.environ['SUPABASE_URL'] = 'http://supabase.test'
+os.environ['SUPABASE_ANON_KEY'] = 'header.payload.signature'
+os.environ['CLIENT_CACHE_TTL'] = '0'
+
+import httpx
+import pytest
+
+from app import app
+from db_calls import assert_db_calls
+from supabase_database import db_service
+
+CLIENT_ROW = {
+    'id': 1, 'client_uuid': 'client-1', 'first_name': 'Thandi', 'last_name': 'Mokoena',
+    'email': 'thandi@example.com', 'phone': '0820000000', 'address': None,
+    'loan_amount': 1000, 'loan_type': 'Secured Loan', 'amount_paid': 200, 'status': 'active',
+    'application_date': None, 'last_status_update': None, 'id_number': None, 'interest_rate': 50,
+    'start_date': '2026-01-01', 'due_date': '2026-02-01', 'monthly_payment': None,
+    'payment_history': [], 'documents': [], 'notes': None, 'archived': False,
+    'created_at': '2026-01-01T00:00:00+00:00', 'updated_at': '2026-01-02T00:00:00+00:00',
+    'last_payment_date': None, 'repayment_due_date': None
+}
+
+ROLLUP_ROWS = [
+    {'dimension': 'total', 'key': 'all', 'client_count': 1, 'loan_amount': 1000, 'amount_paid': 200},
+    {'dimension': 'status', 'key': 'active', 'client_count': 1, 'loan_amount': 1000, 'amount_paid': 200},
+    {'dimension': 'loan_type', 'key': 'Secured Loan', 'client_count': 1, 'loan_amount': 1000, 'amount_paid': 200}
+]
+
+def canned_postgrest(request: httpx.Request) -> httpx.Response:
+    """Answer every PostgREST call with the one-client book above"""
+    path = request.url.path
+    if path.endswith('/rpc/post_payment'):
+        return httpx.Response(200, json={
+            'client': {**CLIENT_ROW, 'amount_paid': 300},
+            'previous': {key: CLIENT_ROW[key] for key in ('status', 'loan_type', 'loan_amount', 'amount_paid', 'archived')},
+            'payment': {'id': 1, 'client_id': 'client-1', 'amount': 100}
+        })
+    if path.endswith('/table_versions'):
+        return httpx.Response(200, json=[{'version': 7}])
+    if path.endswith('/portfolio_rollup'):
+        return httpx.Response(200, json=ROLLUP_ROWS)
+    if path.endswith('/clients'):
+        return httpx.Response(200, json=[CLIENT_ROW], headers={'Content-Range': '0-0/1'})
+    return httpx.Response(404, json={'code': 'PGRST202', 'message': f'Unexpected call to {path}'})
+
+@pytest.fixture(autouse=True)
+def postgrest():
+    """Swap the PostgREST session for one served by canned_postgrest, keeping the round-trip counter hook"""
+    postgrest_client = db_service.client.postgrest
+    session = postgrest_client.session
+    postgrest_client.session = httpx.Client(base_url=session.base_url, headers=session.headers,
+                                            event_hooks=session.event_hooks,
+                                            transport=httpx.MockTransport(canned_postgrest))
+    yield
+    postgrest_client.session = session
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+def test_list_clients_budget(client):
+    # Version check + one page
+    with assert_db_calls(2):
+        response = client.get('/api/clients')
+        assert response.status_code == 200
+    # The counter is wired up, so the budgets aren't met vacuously
+    assert response.headers['X-DB-Calls'] == '2'
+
+def test_list_clients_page_budget(client):
+    with assert_db_calls(2):
+        assert client.get('/api/clients?limit=50').status_code == 200
+
+def test_get_client_budget(client):
+    with assert_db_calls(1):
+        assert client.get('/api/clients/client-1').status_code == 200
+
+def test_add_payment_budget(client):
+    # One post_payment call does the insert, balance and status update
+    with assert_db_calls(1):
+        response = client.post('/api/clients/client-1/payments', json={'amount': 100})
+        assert response.status_code == 201
+
+def test_analytics_budget(client):
+    # Version check + portfolio_rollup read
+    with assert_db_calls(2):
+        assert client.get('/api/analytics').status_code == 200
+
+def test_not_modified_budget(client):
+    # A conditional GET for an unchanged book is answered by the version check alone
+    etag = client.get('/api/analytics').headers['ETag']
+    with assert_db_calls(1):
+        assert client.get('/api/analytics', headers={'If-None-Match': etag}).status_code == 304
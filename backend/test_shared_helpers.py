@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+The api/ service deploys on its own, so it carries copies of backend helper modules
+These tests fail when a copy drifts from the backend original; copy the changed file over.
+Usage: python -m pytest test_shared_helpers.py
+"""
+
+import os
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(BACKEND_DIR, '..', 'api')
+
+# Modules api/ vendors from backend/
+SHARED_MODULES = ['db_calls.py', 'json_responses.py']
+
+@pytest.mark.parametrize('module', SHARED_MODULES)
+def test_api_copy_matches_backend(module):
+    with open(os.path.join(BACKEND_DIR, module), 'rb') as original, open(os.path.join(API_DIR, module), 'rb') as copy:
+        assert copy.read() == original.read(), f"api/{module} differs from backend/{module}"
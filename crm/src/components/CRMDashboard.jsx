@@ -11,18 +11,22 @@ import {
   BarChart3
 } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
-import KanbanBoard from './KanbanBoard';
+import KanbanBoard, { KANBAN_FIELDS } from './KanbanBoard';
 import Dashboard from './Dashboard';
 import ClientModal from './ClientModal';
 import NewClientModal from './NewClientModal';
 import NotificationManager from './NotificationManager';
-import ClientsTable from './ClientsTable';
+import ClientsTable, { CLIENTS_TABLE_FIELDS } from './ClientsTable';
 import StatsBoard from './StatsBoard';
 import { useAuth } from '../contexts/AuthContext';
-import { getClients, addClient, updateClient, deleteClient, updateClientStatus, archiveClient } from '../services/backendApi';
+import { getClients, getClient, addClient, updateClient, deleteClient, updateClientStatus, archiveClient } from '../services/backendApi';
 import { automationService } from '../services/simpleAutomation';
 import { calculateRemainingBalance } from '../utils/loanCalculations';
 
+// The board and table share one client list: fetch only the fields they render
+// (which also cover the dashboard and stats views). The modal loads the full client.
+const CLIENT_LIST_FIELDS = [...new Set([...KANBAN_FIELDS, ...CLIENTS_TABLE_FIELDS])];
+
 function CRMDashboard() {
   const { user, signOut } = useAuth();
   const navigate = useNavigate();
@@ -41,15 +45,12 @@ function CRMDashboard() {
       setLoading(true);
       try {
         console.log('🔄 Loading clients from backend...');
-        const clientData = await getClients();
+        const clientData = await getClients({ fields: CLIENT_LIST_FIELDS });
         console.log('📦 Received client data:', clientData);
         
-        // Run automation to set up initial risk assessments and status updates
-        const automationResult = automationService.runAutomation(clientData);
-        console.log('⚡ Automation result:', automationResult);
-        
-        setClients(automationResult.clients);
-        setNotifications(automationResult.notifications);
+        // Statuses come from the backend status sweep; the browser no longer recomputes them
+        setClients(clientData);
+        setNotifications(automationService.getNotifications());
       } catch (error) {
         console.error('Failed to load clients:', error);
       } finally {
@@ -60,8 +61,14 @@ function CRMDashboard() {
     loadClients();
   }, []);
 
-  const handleClientClick = (client) => {
-    setSelectedClient(client);
+  const handleClientClick = async (client) => {
+    // List entries only carry CLIENT_LIST_FIELDS; the modal shows and edits everything
+    try {
+      setSelectedClient(await getClient(client.id));
+    } catch (error) {
+      console.error('Failed to load client:', error);
+      setSelectedClient(client);
+    }
     setIsClientModalOpen(true);
   };
 
@@ -16,6 +16,11 @@ import {
 } from 'lucide-react';
 import { formatCurrency, formatDate } from '../utils/loanCalculations';
 
+// Client fields the table renders, requested with fields= so the list stays small
+export const CLIENTS_TABLE_FIELDS = [
+  'id', 'email', 'phone', 'idNumber', 'status', 'loanAmount', 'amountPaid', 'dueDate', 'createdAt'
+];
+
 const ClientsTable = ({ clients, onClientClick, onDeleteClient, onRefresh }) => {
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
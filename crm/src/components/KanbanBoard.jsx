@@ -4,6 +4,11 @@ import { RefreshCw, Plus, Trash2 } from 'lucide-react';
 import { updateClientStatus } from '../services/backendApi';
 import { formatCurrency, getStatusColor, getStatusBadgeClasses, calculateCurrentAmountDue, calculateRemainingBalance } from '../utils/loanCalculations';
 
+// Client fields the cards render, requested with fields= so the list stays small
+export const KANBAN_FIELDS = [
+  'id', 'name', 'status', 'loanType', 'loanAmount', 'amountPaid', 'startDate', 'lastPaymentDate', 'dueDate'
+];
+
 const COLUMNS = [
   { 
     id: 'new-lead', 
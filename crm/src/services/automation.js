@@ -6,60 +6,6 @@ export class AutomationService {
     this.notifications = [];
   }
 
-  // Auto-update client statuses based on payment dates and amounts
-  autoUpdateStatuses(clients) {
-    const today = new Date();
-    let hasChanges = false;
-    
-    const updatedClients = clients.map(client => {
-      let newStatus = client.status;
-      
-      // Check if loan is fully paid
-      if (client.amountPaid >= client.loanAmount && client.status !== 'paid') {
-        newStatus = 'paid';
-        hasChanges = true;
-        this.addNotification({
-          type: 'success',
-          clientId: client.id,
-          message: `${client.name}'s loan has been fully paid!`,
-          timestamp: new Date().toISOString()
-        });
-      }
-      // Check for overdue payments
-      else if (client.lastPaymentDate && client.status !== 'overdue') {
-        const nextPaymentDate = calculateNextPaymentDate(client.lastPaymentDate);
-        if (nextPaymentDate && new Date(nextPaymentDate) < today) {
-          newStatus = 'overdue';
-          hasChanges = true;
-          this.addNotification({
-            type: 'warning',
-            clientId: client.id,
-            message: `${client.name} has an overdue payment!`,
-            timestamp: new Date().toISOString()
-          });
-        }
-        // Check for upcoming due payments (within 7 days) - only if currently active
-        else if (nextPaymentDate && client.status === 'active') {
-          const daysUntilDue = Math.ceil((new Date(nextPaymentDate) - today) / (1000 * 60 * 60 * 24));
-          if (daysUntilDue <= 7 && daysUntilDue > 0) {
-            newStatus = 'repayment-due';
-            hasChanges = true;
-            this.addNotification({
-              type: 'info',
-              clientId: client.id,
-              message: `${client.name} has a payment due in ${daysUntilDue} days`,
-              timestamp: new Date().toISOString()
-            });
-          }
-        }
-      }
-      
-      return newStatus !== client.status ? { ...client, status: newStatus } : client;
-    });
-    
-    return { clients: updatedClients, hasChanges };
-  }
-
   // Auto-calculate interest and update loan amounts
   autoCalculateInterest(clients) {
     return clients.map(client => {
@@ -222,10 +168,10 @@ export class AutomationService {
   runAutomation(clients) {
     console.log('Running automation processes...');
     
-    // Update statuses
-    const statusResult = this.autoUpdateStatuses(clients);
-    let updatedClients = statusResult.clients;
-    let hasAnyChanges = statusResult.hasChanges;
+    // Statuses are not recomputed here - the backend status sweep
+    // (SupabaseService.sweep_client_statuses) moves clients to overdue / repayment-due
+    let updatedClients = clients;
+    let hasAnyChanges = false;
     
     // Calculate interest (if applicable) - less frequently
     const shouldCalculateInterest = Math.random() < 0.1; // Only 10% of the time
@@ -41,11 +41,23 @@ const apiCall = async (endpoint, options = {}) => {
   return handleResponse(response);
 };
 
+// Build a query string from listing options, skipping empty values
+const buildQuery = (params = {}) => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value === undefined || value === null || value === '') return;
+    query.set(key, Array.isArray(value) ? value.join(',') : value);
+  });
+  const queryString = query.toString();
+  return queryString ? `?${queryString}` : '';
+};
+
 // Get all clients
-export const getClients = async () => {
+// Optional params: status, loan_type, due_from, due_to, q, fields, include_archived
+export const getClients = async (params = {}) => {
   try {
     console.log('🔍 Fetching clients from backend API...');
-    const data = await apiCall('/clients');
+    const data = await apiCall(`/clients${buildQuery(params)}`);
     console.log('✅ Backend response:', data);
     const clients = Array.isArray(data) ? data : data.clients || [];
     console.log('📊 Processed clients:', clients.length);
@@ -56,6 +68,17 @@ export const getClients = async () => {
   }
 };
 
+// Get one page of clients: { clients, nextCursor, count }
+// Pass the previous page's nextCursor as params.cursor to continue
+export const getClientsPage = async (params = {}) => {
+  try {
+    return await apiCall(`/clients${buildQuery({ limit: 100, ...params })}`);
+  } catch (error) {
+    console.error('Error fetching clients page:', error);
+    throw error;
+  }
+};
+
 // Get a single client by ID
 export const getClient = async (clientId) => {
   try {
@@ -205,6 +228,7 @@ export const checkHealth = async () => {
 // Export default object with all functions
 export default {
   getClients,
+  getClientsPage,
   getClient,
   addClient,
   updateClientStatus,